@@ -4,16 +4,129 @@ Simple API server for Ekstraklasa transfers
 Serves transfer data without external dependencies
 """
 
+import argparse
+import base64
+import bisect
+import csv
+import gzip
+import hashlib
+import itertools
 import json
 import http.server
+import io
 import socketserver
+import threading
+import time
 import urllib.parse
+import zlib
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import os
 
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+from event_stream import SSEBroadcaster
+from publisher import DatasetPublisher, content_hash, read_manifest
+from transfer_db import DEFAULT_DB_FILE, TransferDatabase
+from transfer_fees import with_fee
+from transfer_search import SearchIndex, tokenize
+from transfer_stats import ALL_WINDOWS, STAT_SORTS, TransferStats
+
+DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transfers.json')
+CACHE_MAX_AGE = 30  # seconds clients may reuse a response without revalidating
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+MAX_SEARCH_RESULTS = 100
+
+# Columns of the CSV export and the target size of each streamed chunk
+EXPORT_FIELDS = ['id', 'playerName', 'type', 'fromTeam', 'toTeam', 'transferDate',
+                 'fee', 'feeEur', 'feeCategory', 'summary', 'sourceUrl', 'sourceName']
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Seconds a data file may disagree with its manifest before it is loaded
+# anyway (a publisher writes the manifest right after the data)
+PUBLISH_GRACE = 5
+
+# How often the event stream checks the dataset for new transfers
+STREAM_POLL_INTERVAL = 5  # seconds
+
+# Seconds a client may stall a socket read or write before its worker gives up on it
+REQUEST_TIMEOUT = 30
+BUSY_RESPONSE = (b'HTTP/1.1 503 Service Unavailable\r\nContent-Type: application/json\r\n'
+                 b'Retry-After: 1\r\nConnection: close\r\nContent-Length: 26\r\n\r\n'
+                 b'{"error": "server busy"}\r\n')
+
+def sort_key(transfer):
+    """Position of a transfer in the newest-first order: (transferDate, id)"""
+    try:
+        transfer_id = int(transfer.get('id') or 0)
+    except (TypeError, ValueError):
+        transfer_id = 0
+    return (transfer.get('transferDate') or '', transfer_id)
+
+def encode_cursor(key):
+    """Opaque cursor for the page after the transfer with this sort key"""
+    raw = json.dumps(list(key), separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor):
+    """Get the sort key back from a cursor, raising ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        transfer_date, transfer_id = json.loads(raw)
+    except Exception:
+        raise ValueError('invalid cursor')
+    if not isinstance(transfer_date, str) or not isinstance(transfer_id, int):
+        raise ValueError('invalid cursor')
+    return (transfer_date, transfer_id)
+
+def project(transfers, fields):
+    """Keep only the requested fields of each transfer (lazily for iterators)"""
+    if not fields:
+        return transfers
+    projected = ({field: t[field] for field in fields if field in t} for t in transfers)
+    return list(projected) if isinstance(transfers, list) else projected
+
+def csv_lines(transfers, fields):
+    """Yield a CSV header line, then one line per transfer"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for transfer in transfers:
+        writer.writerow([transfer.get(field, '') for field in fields])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def batched_bytes(lines, size):
+    """Encode lines and join them into blocks of roughly size bytes"""
+    block, length = [], 0
+    for line in lines:
+        data = line.encode('utf-8')
+        block.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(block)
+            block, length = [], 0
+    if block:
+        yield b''.join(block)
+
 class TransferAPI:
-    def __init__(self):
-        self.transfers = self.get_sample_transfers()
+    def __init__(self, transfers=None, version=0, previous=None):
+        # Snapshots are shared between request threads and must not be mutated
+        if transfers is None:
+            transfers = self.get_sample_transfers()
+        # Files written before fees were parsed at ingest get them parsed here
+        self.transfers = tuple(t if 'feeCategory' in t else with_fee(dict(t))
+                               for t in transfers)
+        self.version = version
+        self.build_indexes(previous)
     
     def get_sample_transfers(self):
         """Get sample transfer data (will be replaced with scraped data)"""
@@ -80,33 +193,404 @@ class TransferAPI:
             }
         ]
     
-    def get_transfers(self, team=None, transfer_type=None):
-        """Get filtered transfers"""
-        filtered_transfers = self.transfers
+    def build_indexes(self, previous=None):
+        """Build the date order and per-team/per-type rank lists over self.transfers"""
+        # Newest first by (transferDate, id), the order cursors are keyed on;
+        # the sort is stable, so full ties keep file order
+        self.date_order = sorted(range(len(self.transfers)),
+                                 key=lambda pos: sort_key(self.transfers[pos]),
+                                 reverse=True)
+        self.date_sorted = [self.transfers[pos] for pos in self.date_order]
+        
+        # Ascending copies for bisecting cursors and date bounds into ranks
+        self.keys_ascending = [sort_key(t) for t in reversed(self.date_sorted)]
+        self.dates_ascending = [key[0] for key in self.keys_ascending]
+        
+        # Rank lists are in date order already, so pages are plain slices
+        self.team_index = {}
+        self.type_index = {}
+        for rank, transfer in enumerate(self.date_sorted):
+            for team in {transfer.get('fromTeam'), transfer.get('toTeam')}:
+                if team:
+                    self.team_index.setdefault(team, []).append(rank)
+            self.type_index.setdefault(transfer.get('type'), []).append(rank)
+        
+        self.teams = sorted(team for team in self.team_index if team != 'Wolny agent')
+        self.search_index = SearchIndex(self.date_sorted)
+        if previous is None:
+            self.stats = TransferStats(self.transfers)
+        else:
+            # Carry the previous snapshot's aggregates over, recounting only what changed
+            self.stats = previous.stats.updated(previous.transfers, self.transfers)
+    
+    def new_transfers(self, seen=None):
+        """Get (transfers not in seen, oldest first, the new seen)
+        
+        seen is what an earlier call returned; the first call (seen=None)
+        returns no transfers, only the starting point.
+        """
+        current = {}
+        for transfer in self.date_sorted:
+            current.setdefault(transfer_identity(transfer), transfer)
+        new = [] if seen is None else [t for key, t in current.items() if key not in seen]
+        return new[::-1], set(current)
+    
+    def iter_transfers(self, team=None, transfer_type=None, since=None, until=None,
+                       cursor=None):
+        """Yield matching transfers newest first, straight off the rank lists"""
+        total = len(self.date_sorted)
+        
+        # Ranks [start, stop) hold the dates and cursor range asked for
+        start, stop = 0, total
+        if until:
+            start = total - bisect.bisect_right(self.dates_ascending, until)
+        if cursor:
+            start = max(start, total - bisect.bisect_left(self.keys_ascending, tuple(cursor)))
+        if since:
+            stop = total - bisect.bisect_left(self.dates_ascending, since)
         
         if team:
-            filtered_transfers = [t for t in filtered_transfers 
-                                if t['fromTeam'] == team or t['toTeam'] == team]
+            ranks = self.team_index.get(team, [])
+        elif transfer_type:
+            ranks = self.type_index.get(transfer_type, [])
+        else:
+            ranks = None
         
-        if transfer_type:
-            filtered_transfers = [t for t in filtered_transfers 
-                                if t['type'] == transfer_type]
+        if ranks is None:
+            selected = range(start, stop)
+        else:
+            selected = itertools.islice(ranks, bisect.bisect_left(ranks, start),
+                                        bisect.bisect_left(ranks, stop))
         
-        return filtered_transfers
+        for rank in selected:
+            transfer = self.date_sorted[rank]
+            if team and transfer_type and transfer.get('type') != transfer_type:
+                continue
+            yield transfer
+    
+    def page(self, team=None, transfer_type=None, since=None, until=None,
+             cursor=None, limit=None):
+        """Get (transfers, next cursor) for one page, newest first"""
+        matching = self.iter_transfers(team, transfer_type, since, until, cursor)
+        if not limit:
+            return list(matching), None
+        
+        # One extra record tells whether another page follows
+        transfers = list(itertools.islice(matching, limit + 1))
+        if len(transfers) > limit:
+            transfers = transfers[:limit]
+            return transfers, sort_key(transfers[-1])
+        return transfers, None
+    
+    def get_transfers(self, team=None, transfer_type=None):
+        """Get filtered transfers, newest first"""
+        if not team and not transfer_type:
+            return self.date_sorted
+        
+        return self.page(team, transfer_type)[0]
+    
+    def search(self, query, limit=20):
+        """Get up to limit (transfer, score) pairs for a full-text query"""
+        return self.search_index.search(query, limit)
+    
+    def get_stats(self, team=None, window=ALL_WINDOWS, sort='spend'):
+        """Get spend/income/count aggregates per team"""
+        return self.stats.rows(team, window, sort)
+    
+    def get_teams(self):
+        """Get all unique teams"""
+        return self.teams
+
+class DatabaseTransferAPI:
+    """TransferAPI answering straight from the historical transfer database"""
+    
+    def __init__(self, database, version):
+        self.database = database
+        self.version = version
+    
+    def page(self, team=None, transfer_type=None, since=None, until=None,
+             cursor=None, limit=None):
+        """Get (transfers, next cursor) for one page, newest first"""
+        # One extra row tells whether another page follows
+        transfers = self.database.query(team=team, transfer_type=transfer_type,
+                                        since=since, until=until, cursor=cursor,
+                                        limit=limit + 1 if limit else None)
+        if limit and len(transfers) > limit:
+            transfers = transfers[:limit]
+            return transfers, sort_key(transfers[-1])
+        return transfers, None
+    
+    def iter_transfers(self, team=None, transfer_type=None, since=None, until=None):
+        """Yield matching transfers newest first without loading them all"""
+        return self.database.stream(team=team, transfer_type=transfer_type,
+                                    since=since, until=until)
+    
+    def new_transfers(self, seen=None):
+        """Get (transfers inserted after row id seen, oldest first, the new seen)"""
+        if seen is None:
+            return [], self.database.last_id()
+        transfers = self.database.added_since(seen)
+        return transfers, transfers[-1]['id'] if transfers else seen
+    
+    def get_transfers(self, team=None, transfer_type=None):
+        """Get filtered transfers, newest first"""
+        return self.database.query(team=team, transfer_type=transfer_type)
+    
+    def search(self, query, limit=20):
+        """Get up to limit (transfer, score) pairs for a full-text query"""
+        return self.database.search(query, limit)
+    
+    def get_stats(self, team=None, window=ALL_WINDOWS, sort='spend'):
+        """Get spend/income/count aggregates per team"""
+        return self.database.stats(team, window, sort)
     
     def get_teams(self):
         """Get all unique teams"""
-        teams = set()
-        for transfer in self.transfers:
-            if transfer['fromTeam'] and transfer['fromTeam'] != 'Wolny agent':
-                teams.add(transfer['fromTeam'])
-            if transfer['toTeam'] and transfer['toTeam'] != 'Wolny agent':
-                teams.add(transfer['toTeam'])
-        return sorted(list(teams))
+        return self.database.teams()
+
+class TransferStore:
+    """Shared transfer dataset, loaded once and swapped when a new generation is published
+    
+    When the scrapers' database exists it is queried directly and the JSON
+    file is ignored. Otherwise the JSON file is checked against the hash in
+    its manifest, so a snapshot is never built from data whose manifest
+    has not been written yet, and a republished but identical file is not
+    reloaded.
+    """
+    
+    def __init__(self, filename=DATA_FILE, database=DEFAULT_DB_FILE):
+        self.filename = filename
+        self.manifest_file = DatasetPublisher(filename).manifest_file
+        self.database_file = database
+        self._lock = threading.Lock()
+        self._mtime = None
+        self._hash = None
+        self._version = 0
+        self._api = None
+        self._database = None
+    
+    def _file_mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _stamp(self):
+        """Modification times of the data file and its manifest"""
+        return (self._file_mtime(self.filename), self._file_mtime(self.manifest_file))
+    
+    def _read(self):
+        try:
+            with open(self.filename, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            print(f"Error reading {self.filename}: {e}")
+            return None
+    
+    def _parse(self, data):
+        """Decode transfers, falling back to sample data"""
+        if data is None:
+            return None
+        try:
+            transfers = json.loads(data)
+            if isinstance(transfers, list):
+                return transfers
+            print(f"Unexpected data in {self.filename}, using sample transfers")
+        except ValueError as e:
+            print(f"Error loading {self.filename}: {e}")
+            # Keep serving the previous snapshot if we have one
+            if self._api is not None:
+                return self._api.transfers
+        return None
+    
+    def _refresh(self, stamp):
+        """Swap in the published generation if it differs from the loaded one"""
+        manifest = read_manifest(self.manifest_file)
+        published = manifest.get('hash') if manifest else None
+        data_unchanged = self._mtime is not None and stamp[0] == self._mtime[0]
+        if self._api is not None and data_unchanged and published == self._hash:
+            # Only the manifest changed, e.g. derived HTML was republished
+            self._mtime = stamp
+            return
+        
+        data = self._read()
+        digest = content_hash(data) if data is not None else None
+        if self._api is not None:
+            written = (stamp[0] or 0) / 1e9
+            if published and digest != published and time.time() - written < PUBLISH_GRACE:
+                # Data of the next generation is in place, its manifest is not
+                # yet; keep the current snapshot and look again next time
+                return
+            if digest == self._hash:
+                self._mtime = stamp
+                return
+        
+        transfers = self._parse(data)
+        self._version += 1
+        # Build the new snapshot fully before publishing it
+        if published and digest == published:
+            version = ('json', manifest.get('version'))
+        else:
+            version = self._version
+        self._api = TransferAPI(transfers, version=version, previous=self._api)
+        self._hash = digest
+        self._mtime = stamp
+    
+    def _database_api(self):
+        if self._database is None:
+            with self._lock:
+                if self._database is None:
+                    self._database = TransferDatabase(self.database_file)
+        
+        # Responses are cached per revision, so a changed database invalidates them
+        return DatabaseTransferAPI(self._database, ('db', self._database.revision()))
+    
+    def get(self):
+        """Return the current TransferAPI snapshot, reloading it if a new generation is out"""
+        if self._database is not None or os.path.exists(self.database_file):
+            return self._database_api()
+        
+        stamp = self._stamp()
+        api = self._api
+        if api is not None and stamp == self._mtime:
+            return api
+        
+        with self._lock:
+            if self._api is None or stamp != self._mtime:
+                self._refresh(stamp)
+            return self._api
+
+def accepted_codings(accept_encoding):
+    """Map each coding an Accept-Encoding header names to its q-value"""
+    codings = {}
+    for part in (accept_encoding or '').split(','):
+        coding, *params = [piece.strip() for piece in part.split(';')]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    q = min(max(float(value), 0.0), 1.0)
+                except ValueError:
+                    q = 0.0
+        codings[coding.lower()] = q
+    return codings
+
+def choose_encoding(accept_encoding, available):
+    """Pick the available coding the client weighs highest, 'identity' if none
+
+    A coding refused with q=0 stays refused even when '*' is accepted;
+    ties go to the smaller encoding (br, then gzip).
+    """
+    codings = accepted_codings(accept_encoding)
+    best, best_q = 'identity', 0.0
+    for coding in ('br', 'gzip'):
+        q = codings.get(coding, codings.get('*', 0.0))
+        if coding in available and q > best_q:
+            best, best_q = coding, q
+    return best
+
+class CachedResponse:
+    """Serialized JSON body with precomputed compressed variants and ETags"""
+    
+    def __init__(self, data, headers=None):
+        self.headers = headers or {}
+        body = json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        
+        self.variants = {'identity': (body, f'"{digest}"')}
+        self.variants['gzip'] = (gzip.compress(body, mtime=0), f'"{digest}-gzip"')
+        if brotli is not None:
+            self.variants['br'] = (brotli.compress(body), f'"{digest}-br"')
+        self.etags = {etag for _, etag in self.variants.values()}
+    
+    def choose(self, accept_encoding):
+        """Pick the best variant the client accepts"""
+        return choose_encoding(accept_encoding, self.variants)
+    
+    def matches(self, if_none_match):
+        """Check an If-None-Match header against any variant's ETag"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        tags = {tag.strip() for tag in if_none_match.split(',')}
+        return not tags.isdisjoint(self.etags)
+
+class ResponseCache:
+    """LRU cache of serialized API responses for the current dataset version"""
+    
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._version = None
+        self._entries = OrderedDict()
+    
+    def get(self, version, key, build):
+        """Return the cached response for key, building it on a miss"""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        
+        # Serialize outside the lock so other keys are not held up
+        entry = build()
+        if not isinstance(entry, CachedResponse):
+            entry = CachedResponse(entry)
+        
+        with self._lock:
+            if version == self._version:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+store = TransferStore()
+response_cache = ResponseCache()
+
+def transfer_identity(transfer):
+    """Key telling transfers apart across snapshots, whatever their ids"""
+    return (transfer.get('playerName'), transfer.get('fromTeam'),
+            transfer.get('toTeam'), transfer.get('transferDate'))
+
+def watch_transfers(broadcaster, interval=STREAM_POLL_INTERVAL):
+    """Publish newly ingested transfers and dataset version changes to the event stream"""
+    version = seen = kind = None
+    
+    while True:
+        try:
+            api = store.get()
+            if type(api) is not kind:
+                # First look, or the database appeared: start from what is there now
+                kind, seen = type(api), None
+            if seen is None or api.version != version:
+                new, seen = api.new_transfers(seen)
+                version = api.version
+                
+                for transfer in new:
+                    broadcaster.publish('transfer', transfer)
+                broadcaster.publish('version', {'version': version, 'new': len(new)}, state=True)
+                if new:
+                    print(f"Event stream: {len(new)} new transfers, {broadcaster.connections()} clients")
+        except Exception as e:
+            # A missing or half-published dataset is retried on the next round
+            print(f"Error watching transfers: {e}")
+        time.sleep(interval)
 
 class APIHandler(http.server.SimpleHTTPRequestHandler):
+    # Applied to the socket by StreamRequestHandler.setup()
+    timeout = REQUEST_TIMEOUT
+    
     def __init__(self, *args, **kwargs):
-        self.api = TransferAPI()
+        self.api = store.get()
         super().__init__(*args, **kwargs)
     
     def do_GET(self):
@@ -115,40 +599,263 @@ class APIHandler(http.server.SimpleHTTPRequestHandler):
         
         if parsed_path.path == '/api/transfers':
             self.handle_transfers(parsed_path)
+        elif parsed_path.path == '/api/transfers.ndjson':
+            self.handle_export(parsed_path, 'ndjson')
+        elif parsed_path.path == '/api/transfers.csv':
+            self.handle_export(parsed_path, 'csv')
+        elif parsed_path.path == '/api/search':
+            self.handle_search(parsed_path)
+        elif parsed_path.path == '/api/stats':
+            self.handle_stats(parsed_path)
+        elif parsed_path.path == '/api/stream':
+            self.handle_stream(parsed_path)
         elif parsed_path.path == '/api/teams':
             self.handle_teams()
         else:
             # Serve static files
             super().do_GET()
     
+    def send_cached_json(self, key, build):
+        """Send a JSON response from the cache, honouring If-None-Match"""
+        entry = response_cache.get(self.api.version, key, build)
+        coding = entry.choose(self.headers.get('Accept-Encoding'))
+        body, etag = entry.variants[coding]
+        
+        if entry.matches(self.headers.get('If-None-Match')):
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', f'public, max-age={CACHE_MAX_AGE}')
+            self.send_header('Vary', 'Accept-Encoding')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Access-Control-Expose-Headers', 'X-Next-Cursor, Link')
+            self.end_headers()
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if coding != 'identity':
+            self.send_header('Content-Encoding', coding)
+        for name, value in entry.headers.items():
+            self.send_header(name, value)
+        self.send_header('ETag', etag)
+        self.send_header('Cache-Control', f'public, max-age={CACHE_MAX_AGE}')
+        self.send_header('Vary', 'Accept-Encoding')
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Access-Control-Expose-Headers', 'X-Next-Cursor, Link')
+        self.end_headers()
+        
+        self.wfile.write(body)
+    
+    def send_error_json(self, status, message):
+        """Send an uncached JSON error"""
+        body = json.dumps({'error': message}, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('Access-Control-Allow-Origin', '*')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def parse_filters(self, query_params):
+        """Read team/type/since/until/fields, raising ValueError for bad values"""
+        param = lambda name: query_params.get(name, [None])[0]
+        
+        since, until = param('since'), param('until')
+        for value in (since, until):
+            if value:
+                try:
+                    datetime.strptime(value, '%Y-%m-%d')
+                except ValueError:
+                    raise ValueError('since and until must be YYYY-MM-DD dates')
+        
+        return {
+            'team': param('team'),
+            'transfer_type': param('type'),
+            'since': since,
+            'until': until,
+            'fields': tuple(f for f in (param('fields') or '').split(',') if f),
+        }
+    
     def handle_transfers(self, parsed_path):
-        """Handle transfers API endpoint"""
+        """Handle transfers API endpoint
+        
+        Supports limit, cursor (from the previous page's X-Next-Cursor
+        header), since/until (YYYY-MM-DD, inclusive) and fields=a,b,c.
+        """
         query_params = urllib.parse.parse_qs(parsed_path.query)
+        param = lambda name: query_params.get(name, [None])[0]
         
-        team = query_params.get('team', [None])[0]
-        transfer_type = query_params.get('type', [None])[0]
+        try:
+            limit = int(param('limit') or DEFAULT_PAGE_SIZE)
+            if not 1 <= limit <= MAX_PAGE_SIZE:
+                raise ValueError
+        except ValueError:
+            self.send_error_json(400, f'limit must be between 1 and {MAX_PAGE_SIZE}')
+            return
+        
+        try:
+            filters = self.parse_filters(query_params)
+            cursor = decode_cursor(param('cursor')) if param('cursor') else None
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+            return
+        
+        fields = filters.pop('fields')
+        
+        def build():
+            transfers, next_key = self.api.page(cursor=cursor, limit=limit, **filters)
+            headers = {}
+            if next_key:
+                next_cursor = encode_cursor(next_key)
+                params = {name: values[0] for name, values in query_params.items()}
+                params['cursor'] = next_cursor
+                headers['X-Next-Cursor'] = next_cursor
+                headers['Link'] = f'<{parsed_path.path}?{urllib.parse.urlencode(params)}>; rel="next"'
+            return CachedResponse(project(transfers, fields), headers)
+        
+        # Only parameters that affect the result go into the cache key
+        key = ('/api/transfers', tuple(filters.values()) + (cursor, limit, fields))
+        self.send_cached_json(key, build)
+    
+    def handle_export(self, parsed_path, fmt):
+        """Stream every matching transfer as NDJSON or CSV
+        
+        Records are serialized as they come off the store and sent in
+        chunks, so memory use does not grow with the size of the export.
+        """
+        query_params = urllib.parse.parse_qs(parsed_path.query)
+        try:
+            filters = self.parse_filters(query_params)
+        except ValueError as e:
+            self.send_error_json(400, str(e))
+            return
+        
+        fields = filters.pop('fields')
+        transfers = self.api.iter_transfers(**filters)
+        if fmt == 'csv':
+            lines = csv_lines(transfers, fields or EXPORT_FIELDS)
+            content_type = 'text/csv; charset=utf-8'
+        else:
+            lines = (json.dumps(t, ensure_ascii=False, separators=(',', ':')) + '\n'
+                     for t in project(transfers, fields))
+            content_type = 'application/x-ndjson; charset=utf-8'
         
-        transfers = self.api.get_transfers(team, transfer_type)
+        # Chunked encoding needs HTTP/1.1; older clients get the body until close
+        chunked = self.request_version == 'HTTP/1.1'
+        if chunked:
+            self.protocol_version = 'HTTP/1.1'
+        compress = choose_encoding(self.headers.get('Accept-Encoding'), ('gzip',)) == 'gzip'
         
         self.send_response(200)
-        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-type', content_type)
+        if chunked:
+            self.send_header('Transfer-Encoding', 'chunked')
+        if compress:
+            self.send_header('Content-Encoding', 'gzip')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Connection', 'close')
         self.end_headers()
+        self.close_connection = True
         
-        response = json.dumps(transfers, ensure_ascii=False, indent=2)
-        self.wfile.write(response.encode('utf-8'))
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        write = self.write_chunk if chunked else self.wfile.write
+        try:
+            for block in batched_bytes(lines, EXPORT_CHUNK_SIZE):
+                if compressor:
+                    block = compressor.compress(block)
+                if block:
+                    write(block)
+            if compressor:
+                write(compressor.flush())
+            if chunked:
+                self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            # Client went away; stop reading from the store
+            pass
+        finally:
+            # Release the store's cursor even if the client disconnected
+            close = getattr(transfers, 'close', None)
+            if close:
+                close()
     
-    def handle_teams(self):
-        """Handle teams API endpoint"""
-        teams = self.api.get_teams()
+    def write_chunk(self, data):
+        self.wfile.write(f'{len(data):X}\r\n'.encode('ascii') + data + b'\r\n')
+    
+    def handle_search(self, parsed_path):
+        """Handle full-text search endpoint: ?q=words&limit=N, best matches first"""
+        query_params = urllib.parse.parse_qs(parsed_path.query)
+        query = query_params.get('q', [''])[0]
+        
+        try:
+            limit = int(query_params.get('limit', [20])[0])
+            if not 1 <= limit <= MAX_SEARCH_RESULTS:
+                raise ValueError
+        except ValueError:
+            self.send_error_json(400, f'limit must be between 1 and {MAX_SEARCH_RESULTS}')
+            return
+        
+        def build():
+            return [dict(transfer, score=round(score, 3))
+                    for transfer, score in self.api.search(query, limit)]
+        
+        # Queries differing only in case or diacritics share a cache entry
+        key = ('/api/search', (' '.join(tokenize(query)), limit))
+        self.send_cached_json(key, build)
+    
+    def handle_stats(self, parsed_path):
+        """Handle fee analytics endpoint: ?team=&window=2025-summer|all|*&sort=net"""
+        query_params = urllib.parse.parse_qs(parsed_path.query)
+        team = query_params.get('team', [None])[0]
+        window = query_params.get('window', [ALL_WINDOWS])[0]
+        sort = query_params.get('sort', ['spend'])[0]
+        if sort not in STAT_SORTS:
+            self.send_error_json(400, f"sort must be one of {', '.join(STAT_SORTS)}")
+            return
+        
+        # '*' lists every window separately
+        if window == '*':
+            window = None
+        
+        def build():
+            return self.api.get_stats(team, window, sort)
+        
+        self.send_cached_json(('/api/stats', (team, window, sort)), build)
+    
+    def handle_stream(self, parsed_path):
+        """Subscribe to Server-Sent Events: 'transfer' for new transfers, 'version' for dataset changes
+        
+        After the headers the connection is handed to the broadcaster, so
+        an idle subscriber does not keep a worker thread busy.
+        """
+        broadcaster = getattr(self.server, 'broadcaster', None)
+        if broadcaster is None:
+            self.send_error_json(503, 'event stream not available')
+            return
+        
+        # EventSource sends Last-Event-ID when reconnecting; ?lastEventId= works for other clients
+        query_params = urllib.parse.parse_qs(parsed_path.query)
+        last_event_id = (self.headers.get('Last-Event-ID')
+                         or query_params.get('lastEventId', [None])[0])
         
         self.send_response(200)
-        self.send_header('Content-type', 'application/json')
+        self.send_header('Content-type', 'text/event-stream; charset=utf-8')
+        self.send_header('Cache-Control', 'no-cache')
         self.send_header('Access-Control-Allow-Origin', '*')
+        self.send_header('Connection', 'close')
+        self.send_header('X-Accel-Buffering', 'no')
         self.end_headers()
+        self.wfile.flush()
+        self.close_connection = True
         
-        response = json.dumps(teams, ensure_ascii=False, indent=2)
-        self.wfile.write(response.encode('utf-8'))
+        self.server.detach(self.request)
+        broadcaster.attach(self.request, last_event_id)
+    
+    def handle_teams(self):
+        """Handle teams API endpoint"""
+        self.send_cached_json(('/api/teams', ()), self.api.get_teams)
     
     def do_OPTIONS(self):
         """Handle CORS preflight requests"""
@@ -158,18 +865,100 @@ class APIHandler(http.server.SimpleHTTPRequestHandler):
         self.send_header('Access-Control-Allow-Headers', 'Content-Type')
         self.end_headers()
 
-def run_server():
-    """Run the API server"""
-    PORT = 8080
+class ThreadPoolHTTPServer(socketserver.TCPServer):
+    """TCP server that handles connections on a bounded pool of worker threads
+    
+    At most workers + backlog connections are being handled or waiting for
+    a worker; beyond that new connections get an immediate 503, so a burst
+    cannot queue up unbounded sockets and memory.
+    """
+    
+    allow_reuse_address = True
+    
+    def __init__(self, server_address, handler_class, workers=8, backlog=64):
+        self.request_queue_size = backlog
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix='api-worker')
+        self.slots = threading.BoundedSemaphore(workers + backlog)
+        self.broadcaster = None
+        # Sockets handed over to the broadcaster; they outlive their request
+        self.detached = set()
+        super().__init__(server_address, handler_class)
+    
+    def process_request(self, request, client_address):
+        if not self.slots.acquire(blocking=False):
+            self.reject_request(request)
+            return
+        try:
+            self.executor.submit(self.process_request_thread, request, client_address)
+        except RuntimeError:
+            # Executor already shut down
+            self.slots.release()
+            self.shutdown_request(request)
     
-    with socketserver.TCPServer(("", PORT), APIHandler) as httpd:
-        print(f"Server running at http://localhost:{PORT}")
+    def reject_request(self, request):
+        """Answer 503 without waiting on the client, then close"""
+        try:
+            request.setblocking(False)
+            request.send(BUSY_RESPONSE)
+        except OSError:
+            pass
+        self.shutdown_request(request)
+    
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+            self.slots.release()
+    
+    def detach(self, request):
+        """Keep request's socket open after its handler returns"""
+        self.detached.add(request)
+    
+    def shutdown_request(self, request):
+        if request in self.detached:
+            self.detached.discard(request)
+            return
+        super().shutdown_request(request)
+    
+    def server_close(self):
+        super().server_close()
+        self.executor.shutdown(wait=False)
+
+def run_server(port=8080, workers=8, backlog=64):
+    """Run the API server"""
+    with ThreadPoolHTTPServer(("", port), APIHandler,
+                              workers=workers, backlog=backlog) as httpd:
+        httpd.broadcaster = SSEBroadcaster()
+        threading.Thread(target=watch_transfers, args=(httpd.broadcaster,),
+                         name='transfer-watcher', daemon=True).start()
+        
+        print(f"Server running at http://localhost:{port} ({workers} workers)")
         print(f"API endpoints:")
         print(f"  - GET /api/transfers - Get all transfers")
         print(f"  - GET /api/transfers?team=Legia%20Warszawa - Filter by team")
         print(f"  - GET /api/transfers?type=in - Filter by transfer type")
+        print(f"  - GET /api/transfers?limit=50&since=2025-01-01&fields=playerName,fee - Page, date range, fields")
+        print(f"  - GET /api/transfers.ndjson, /api/transfers.csv - Stream the full export")
+        print(f"  - GET /api/search?q=wypożyczenie - Full-text search")
         print(f"  - GET /api/teams - Get all teams")
-        httpd.serve_forever()
+        print(f"  - GET /api/stats?window=2025-summer&sort=net - Spend/income per team")
+        print(f"  - GET /api/stream - Server-Sent Events for new transfers")
+        try:
+            httpd.serve_forever()
+        except KeyboardInterrupt:
+            print("\nShutting down server")
 
 if __name__ == "__main__":
-    run_server()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Ekstraklasa transfers API server')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--workers', type=int, default=8,
+                        help='number of worker threads handling requests')
+    parser.add_argument('--backlog', type=int, default=64,
+                        help='listen backlog for pending connections')
+    args = parser.parse_args()
+    
+    run_server(port=args.port, workers=args.workers, backlog=args.backlog)
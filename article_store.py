@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Persistent store of processed transfer articles
+Lets the scrapers skip articles that were already parsed on earlier runs
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+DEFAULT_STORE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'articles.db')
+
+def content_hash(data):
+    """Hash page content or a headline for change detection"""
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+class ArticleStore:
+    """SQLite table of article URLs, their hashes and extracted transfers"""
+
+    def __init__(self, filename=DEFAULT_STORE_FILE):
+        self.filename = filename
+        self.lock = threading.Lock()
+        # Shared between source threads; every access goes through self.lock
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS articles (
+                url TEXT PRIMARY KEY,
+                title_hash TEXT,
+                content_hash TEXT,
+                record TEXT,
+                first_seen TEXT,
+                last_seen TEXT
+            )
+        ''')
+        self.conn.commit()
+
+    def get(self, url):
+        """Get (title_hash, content_hash, record) for a URL, or None"""
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT title_hash, content_hash, record FROM articles WHERE url = ?',
+                (url,)).fetchone()
+
+        if row is None:
+            return None
+
+        title_hash, body_hash, record = row
+        return title_hash, body_hash, json.loads(record) if record else None
+
+    def put(self, url, title, body, record):
+        """Record that an article was processed and what it produced"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.lock:
+            self.conn.execute('''
+                INSERT INTO articles (url, title_hash, content_hash, record, first_seen, last_seen)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(url) DO UPDATE SET
+                    title_hash = excluded.title_hash,
+                    content_hash = excluded.content_hash,
+                    record = excluded.record,
+                    last_seen = excluded.last_seen
+            ''', (url, content_hash(title), content_hash(body),
+                  json.dumps(record, ensure_ascii=False) if record else None, now, now))
+            self.conn.commit()
+
+    def touch(self, url, title):
+        """Mark a known article as seen again under its current headline"""
+        now = datetime.now().isoformat(timespec='seconds')
+        with self.lock:
+            self.conn.execute(
+                'UPDATE articles SET title_hash = ?, last_seen = ? WHERE url = ?',
+                (content_hash(title), now, url))
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
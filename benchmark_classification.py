@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for transfer type and fee classification
+Compares the old per-keyword loops with the combined single-scan regex
+
+Usage: python3 benchmark_classification.py [article.txt ...]
+Without arguments the summaries from transfers.json are used as the corpus.
+"""
+
+import json
+import re
+import sys
+import time
+
+from transfer_classification import classify_transfer
+
+def old_determine_transfer_type(text):
+    text_lower = text.lower()
+
+    outgoing = ['opuszcza', 'odchodzi', 'sprzedany', 'wypożyczony', 'żegna się', 'transfer do']
+    incoming = ['dołącza', 'podpisuje', 'przychodzi', 'zatrudnia', 'transfer z', 'nowym zawodnikiem']
+
+    for keyword in outgoing:
+        if keyword in text_lower:
+            return 'out'
+    for keyword in incoming:
+        if keyword in text_lower:
+            return 'in'
+    return 'in'
+
+def old_extract_fee(text):
+    patterns = [
+        r'(\d+\.?\d*)\s*m(?:ilion)?\s*€',
+        r'(\d+)\s*tys(?:iąc|.)?\s*€',
+        r'bezpłatnie',
+        r'wolny.*agent',
+        r'wypożyczenie',
+    ]
+    for pattern in patterns:
+        match = re.search(pattern, text, re.IGNORECASE)
+        if match:
+            if 'bezpłatnie' in pattern or 'wolny' in pattern:
+                return 'Bez opłaty'
+            elif 'wypożyczenie' in pattern:
+                return 'Wypożyczenie'
+            return match.group(0)
+    return 'Nieznana'
+
+def old_classify(text):
+    return old_determine_transfer_type(text), old_extract_fee(text)
+
+def load_corpus():
+    if len(sys.argv) > 1:
+        texts = []
+        for path in sys.argv[1:]:
+            with open(path, 'r', encoding='utf-8') as f:
+                texts.append(f.read())
+        return texts
+
+    with open('transfers.json', 'r', encoding='utf-8') as f:
+        transfers = json.load(f)
+
+    # Surround each summary with unrelated text to approximate a full article
+    filler = ('Mecz zakończył się remisem, a trener pochwalił postawę drużyny '
+              'w drugiej połowie spotkania na stadionie przy pełnych trybunach. ') * 15
+    return [f"{filler} {t['summary']} {filler}" for t in transfers]
+
+def measure(func, corpus, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text in corpus:
+            func(text)
+    return (time.perf_counter() - started) / (rounds * len(corpus)) * 1e6
+
+def main():
+    corpus = load_corpus()
+    rounds = 200
+
+    old_us = measure(old_classify, corpus, rounds)
+    new_us = measure(classify_transfer, corpus, rounds)
+
+    print(f"{len(corpus)} texts, {rounds} rounds")
+    print(f"keyword loops + re.search: {old_us:.1f} us/text")
+    print(f"combined regex:            {new_us:.1f} us/text")
+    print(f"speedup: {old_us / new_us:.1f}x")
+
+if __name__ == "__main__":
+    main()
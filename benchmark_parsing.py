@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Benchmark for article page parsing
+Compares full html.parser parsing with the lxml + SoupStrainer path
+
+Usage: python3 benchmark_parsing.py [page.html ...]
+Without arguments two synthetic news pages are used, one with an
+<article> container and one laid out with tables only.
+"""
+
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+from html_parsing import PARSER, parse_article
+
+NAV = ''.join(f'<li><a href="/news/{i}">Wiadomość numer {i}</a></li>' for i in range(400))
+BODY = ''.join(f'<p>Akapit {i}: zawodnik dołącza do Lecha Poznań za 1.5M €.</p>' for i in range(15))
+
+def synthetic_page():
+    """Build a news page with heavy navigation around a short article"""
+    sidebar = ''.join(f'<div class="widget"><h4>Tabela {i}</h4><p>{"Legia Lech Raków " * 20}</p></div>'
+                      for i in range(60))
+    return f'''<html><head><title>Transfer</title></head><body>
+        <nav><ul>{NAV}</ul></nav>
+        <aside>{sidebar}</aside>
+        <article><h1>Nowy transfer</h1><time>12.01.2025</time>{BODY}</article>
+        <footer>{NAV}</footer>
+    </body></html>'''.encode('utf-8')
+
+def table_page():
+    """Build a 90minut.pl-style page: nested tables and no article container"""
+    rows = ''.join(f'<tr><td>{i}.</td><td>Legia Lech Raków</td><td>{i % 9}:{i % 4}</td></tr>'
+                   for i in range(300))
+    return f'''<html><head><title>Transfer</title></head><body>
+        <table><tr><td><ul>{NAV}</ul></td>
+        <td><h1>Nowy transfer</h1><span>12.01.2025</span>{BODY}<table>{rows}</table></td></tr></table>
+    </body></html>'''.encode('utf-8')
+
+def old_parse(content):
+    soup = BeautifulSoup(content, 'html.parser')
+    return soup, soup.get_text()
+
+def measure(func, content, rounds):
+    started = time.perf_counter()
+    for _ in range(rounds):
+        func(content)
+    return (time.perf_counter() - started) / rounds * 1000
+
+def main():
+    if len(sys.argv) > 1:
+        pages = []
+        for path in sys.argv[1:]:
+            with open(path, 'rb') as f:
+                pages.append((path, f.read()))
+    else:
+        pages = [('synthetic page', synthetic_page()),
+                 ('page without container', table_page())]
+
+    rounds = 20
+    print(f"Parser backend: {PARSER}, {rounds} rounds per page")
+
+    for name, content in pages:
+        old_ms = measure(old_parse, content, rounds)
+        new_ms = measure(parse_article, content, rounds)
+        print(f"{name} ({len(content) // 1024} KB): "
+              f"html.parser {old_ms:.1f} ms, strained {new_ms:.1f} ms, "
+              f"speedup {old_ms / new_ms:.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+Build the static site: pages from their templates and the dataset as per-season shards
+simple.html embeds transfers.json; index.html loads the shards from data/ on demand
+"""
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import date
+
+from deduplication import is_unknown
+from publisher import AtomicFile, DatasetPublisher, atomic_write, content_hash, read_manifest
+from transfer_db import DEFAULT_DB_FILE, TransferDatabase
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TEMPLATE = os.path.join(ROOT, 'simple.template.html')
+DEFAULT_DATA = os.path.join(ROOT, 'transfers.json')
+DEFAULT_OUTPUTS = [os.path.join(ROOT, 'simple.html')]
+INDEX_TEMPLATE = os.path.join(ROOT, 'index.template.html')
+INDEX_OUTPUT = os.path.join(ROOT, 'index.html')
+
+# Content-hashed shards and the small index.json pointing at them
+SHARD_DIR = os.path.join(ROOT, 'data')
+SHARD_INDEX = 'index.json'
+UNKNOWN_SEASON = 'unknown'
+
+TRANSFERS_PLACEHOLDER = '{{TRANSFERS}}'
+UPDATED_PLACEHOLDER = '{{UPDATED}}'
+
+READ_SIZE = 64 * 1024
+
+def iter_json_array(f, read_size=READ_SIZE):
+    """Yield the elements of the JSON array in text file f one at a time"""
+    decoder = json.JSONDecoder()
+    buffer, pos = '', 0
+    eof = started = False
+
+    while True:
+        # Skip whitespace and separators
+        while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+            pos += 1
+
+        element = end = None
+        if pos < len(buffer):
+            if not started:
+                if buffer[pos] != '[':
+                    raise ValueError('expected a JSON array')
+                started = True
+                pos += 1
+                continue
+            if buffer[pos] == ']':
+                return
+            try:
+                element, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            # A value reaching the end of the buffer may continue in the next chunk
+            if end is not None and (end < len(buffer) or eof):
+                yield element
+                pos = end
+                continue
+
+        if eof:
+            raise ValueError('unterminated JSON array')
+        chunk = f.read(read_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+def script_json(value):
+    """Compact JSON that is safe inside a <script> element"""
+    text = json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+    # "</script>" or "<!--" in a summary would otherwise end or confuse the element;
+    # \u003c is valid both as JSON and as JavaScript
+    return text.replace('<', '\\u003c')
+
+def display_date(transfer_date):
+    """dd.mm.yyyy as the pages show it, so browsers do not format dates per render"""
+    try:
+        return date.fromisoformat((transfer_date or '')[:10]).strftime('%d.%m.%Y')
+    except ValueError:
+        return transfer_date or ''
+
+def with_display_date(transfer):
+    return dict(transfer, transferDateText=display_date(transfer.get('transferDate')))
+
+def render(template, transfers, updated):
+    """Yield the page in pieces, transfers streamed into the placeholder if it has one"""
+    if template.count(TRANSFERS_PLACEHOLDER) > 1:
+        raise ValueError(f'template must contain {TRANSFERS_PLACEHOLDER} at most once')
+    template = template.replace(UPDATED_PLACEHOLDER, updated)
+    if TRANSFERS_PLACEHOLDER not in template:
+        yield template
+        return
+    head, tail = template.split(TRANSFERS_PLACEHOLDER)
+
+    yield head + '['
+    for index, transfer in enumerate(transfers):
+        yield (',' if index else '') + script_json(transfer)
+    yield ']' + tail
+
+def updated_date(manifest):
+    """Date shown as last update: when the dataset was published, else today"""
+    published = (manifest or {}).get('published', '')
+    try:
+        day = date.fromisoformat(published[:10])
+    except ValueError:
+        day = date.today()
+    return day.strftime('%d.%m.%Y')
+
+def build(template_file=DEFAULT_TEMPLATE, data_file=DEFAULT_DATA, outputs=DEFAULT_OUTPUTS):
+    """Render every output in one pass; returns the outputs written (none if unchanged)"""
+    publisher = DatasetPublisher(data_file)
+    manifest = publisher.manifest()
+
+    with open(template_file, 'r', encoding='utf-8') as f:
+        template = f.read()
+
+    digest = hashlib.sha256()
+    files = [AtomicFile(path) for path in outputs]
+    try:
+        with open(data_file, 'r', encoding='utf-8') as f:
+            transfers = map(with_display_date, iter_json_array(f))
+            for piece in render(template, transfers, updated_date(manifest)):
+                data = piece.encode('utf-8')
+                digest.update(data)
+                for output in files:
+                    output.write(data)
+    except BaseException:
+        for output in files:
+            output.discard()
+        raise
+
+    digest = 'sha256:' + digest.hexdigest()
+    written = []
+    for output in files:
+        if publisher.unchanged(output.path, digest):
+            output.discard()
+        else:
+            output.commit()
+            written.append(output.path)
+    if written:
+        publisher.record_files({path: digest for path in written})
+    return written
+
+def season(transfer_date):
+    """Season of an ISO date, July to June: '2024-25'"""
+    try:
+        year, month = int(transfer_date[:4]), int(transfer_date[5:7])
+    except (TypeError, ValueError):
+        return UNKNOWN_SEASON
+    start = year if month >= 7 else year - 1
+    return f'{start}-{(start + 1) % 100:02d}'
+
+def load_transfers(data_file=DEFAULT_DATA, database_file=DEFAULT_DB_FILE):
+    """Full history from the database when there is one, else transfers.json"""
+    if os.path.exists(database_file):
+        database = TransferDatabase(database_file)
+        try:
+            return list(database.stream())
+        finally:
+            database.close()
+    with open(data_file, 'r', encoding='utf-8') as f:
+        return list(iter_json_array(f))
+
+def build_shards(transfers, directory=SHARD_DIR, publisher=None):
+    """Write one minified, content-hashed JSON file per season and index.json
+
+    Shard names change whenever their content does, so they can be cached
+    forever; only index.json has to be revalidated. Returns the shard files
+    written; unchanged shards are not rewritten.
+    """
+    os.makedirs(directory, exist_ok=True)
+    publisher = publisher or DatasetPublisher()
+
+    seasons = {}
+    teams = set()
+    for transfer in map(with_display_date, transfers):
+        seasons.setdefault(season(transfer.get('transferDate')), []).append(transfer)
+        for team in (transfer.get('fromTeam'), transfer.get('toTeam')):
+            if not is_unknown(team) and team != 'Wolny agent':
+                teams.add(team)
+
+    # Newest season first, undated transfers last
+    order = sorted((key for key in seasons if key != UNKNOWN_SEASON), reverse=True)
+    if UNKNOWN_SEASON in seasons:
+        order.append(UNKNOWN_SEASON)
+
+    shards, written = [], []
+    for key in order:
+        records = sorted(seasons[key], reverse=True,
+                         key=lambda t: (t.get('transferDate') or '', t.get('id') or 0))
+        data = json.dumps(records, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        name = f"transfers-{key}.{content_hash(data)[7:19]}.json"
+        path = os.path.join(directory, name)
+        if not os.path.exists(path):
+            atomic_write(path, data)
+            written.append(name)
+
+        dates = [t['transferDate'] for t in records if t.get('transferDate')]
+        shards.append({
+            'season': key,
+            'file': name,
+            'count': len(records),
+            'from': min(dates) if dates else None,
+            'to': max(dates) if dates else None,
+        })
+
+    index_path = os.path.join(directory, SHARD_INDEX)
+    previous = read_manifest(index_path) or {}
+    index = {
+        'version': (publisher.manifest() or {}).get('version'),
+        'count': sum(shard['count'] for shard in shards),
+        'teams': sorted(teams),
+        'shards': shards,
+    }
+    data = json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    publisher.publish_file(index_path, data)
+
+    # Keep the previous generation's shards for pages that loaded the old index
+    keep = {shard['file'] for shard in shards + previous.get('shards', [])}
+    for name in os.listdir(directory):
+        if name.startswith('transfers-') and name.endswith('.json') and name not in keep:
+            os.remove(os.path.join(directory, name))
+    return written
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the static transfer pages and data shards')
+    parser.add_argument('--data', default=DEFAULT_DATA)
+    parser.add_argument('--database', default=DEFAULT_DB_FILE,
+                        help='history to shard; transfers.json is used if it does not exist')
+    parser.add_argument('--shards', default=SHARD_DIR, help='directory for the data shards')
+    args = parser.parse_args()
+
+    publisher = DatasetPublisher(args.data)
+    written = build(DEFAULT_TEMPLATE, args.data, DEFAULT_OUTPUTS)
+    written += build(INDEX_TEMPLATE, args.data, [INDEX_OUTPUT])
+    shards = build_shards(load_transfers(args.data, args.database), args.shards, publisher)
+
+    if written:
+        print(f"Built {', '.join(os.path.basename(path) for path in written)}")
+    else:
+        print('Pages unchanged')
+    print(f"Wrote {len(shards)} new data shards to {args.shards}")
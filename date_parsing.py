@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Date normalization shared by the transfer scrapers
+Turns the date strings found on Polish football sites into YYYY-MM-DD
+"""
+
+import re
+from datetime import date, timedelta
+from functools import lru_cache
+
+# Nominative, genitive and abbreviated month names
+POLISH_MONTHS = {
+    'styczeń': 1, 'stycznia': 1, 'sty': 1,
+    'luty': 2, 'lutego': 2, 'lut': 2,
+    'marzec': 3, 'marca': 3, 'mar': 3,
+    'kwiecień': 4, 'kwietnia': 4, 'kwi': 4,
+    'maj': 5, 'maja': 5,
+    'czerwiec': 6, 'czerwca': 6, 'cze': 6,
+    'lipiec': 7, 'lipca': 7, 'lip': 7,
+    'sierpień': 8, 'sierpnia': 8, 'sie': 8,
+    'wrzesień': 9, 'września': 9, 'wrz': 9,
+    'październik': 10, 'października': 10, 'paź': 10,
+    'listopad': 11, 'listopada': 11, 'lis': 11,
+    'grudzień': 12, 'grudnia': 12, 'gru': 12,
+}
+
+# Days before today for relative words
+RELATIVE_DAYS = {
+    'dzisiaj': 0, 'dziś': 0, 'today': 0,
+    'wczoraj': 1, 'yesterday': 1,
+    'przedwczoraj': 2,
+}
+
+_DAY_FIRST = re.compile(r'(\d{1,2})[./-](\d{1,2})[./-](\d{4}|\d{2})\b')
+_ISO = re.compile(r'(\d{4})-(\d{1,2})-(\d{1,2})\b')
+_MONTH_NAME = re.compile(r'(\d{1,2})\.?\s+([^\W\d_]+)\.?\s+(\d{4})')
+
+def _make_date(year, month, day):
+    if year < 100:
+        # Same pivot as strptime's %y
+        year += 2000 if year < 69 else 1900
+    try:
+        return date(year, month, day).isoformat()
+    except ValueError:
+        return None
+
+@lru_cache(maxsize=4096)
+def _normalize(raw, today):
+    text = raw.strip().lower()
+
+    match = _ISO.search(text)
+    if match:
+        result = _make_date(int(match.group(1)), int(match.group(2)), int(match.group(3)))
+        if result:
+            return result
+
+    match = _DAY_FIRST.search(text)
+    if match:
+        result = _make_date(int(match.group(3)), int(match.group(2)), int(match.group(1)))
+        if result:
+            return result
+
+    match = _MONTH_NAME.search(text)
+    if match and match.group(2) in POLISH_MONTHS:
+        result = _make_date(int(match.group(3)), POLISH_MONTHS[match.group(2)], int(match.group(1)))
+        if result:
+            return result
+
+    for word, days in RELATIVE_DAYS.items():
+        if word in text:
+            return (date.fromisoformat(today) - timedelta(days=days)).isoformat()
+
+    return None
+
+class DateNormalizer:
+    """Normalizes scraped dates against a single 'today' fixed for the run"""
+
+    def __init__(self, today=None):
+        self.today = (today or date.today()).isoformat()
+
+    def parse(self, raw):
+        """Get YYYY-MM-DD for raw, or None if it is not a recognisable date"""
+        if not raw:
+            return None
+        return _normalize(raw, self.today)
+
+    def normalize(self, raw):
+        """Get YYYY-MM-DD for raw, falling back to today"""
+        return self.parse(raw) or self.today
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Cross-source transfer deduplication
+Merges reports of the same transfer from different sites, even when they
+disagree on diacritics, name spelling or which clubs are known
+"""
+
+import re
+import unicodedata
+from datetime import date
+from difflib import SequenceMatcher
+from functools import lru_cache
+
+from transfer_fees import with_fee
+
+# Earlier sources win when merged records disagree. Official club sites are
+# named "<club> - Oficjalna strona" and rank where OFFICIAL_SOURCE is listed.
+OFFICIAL_SUFFIX = ' - Oficjalna strona'
+OFFICIAL_SOURCE = 'official'
+SOURCE_PRIORITY = ['Transfermarkt.pl', OFFICIAL_SOURCE, 'Ekstraklasa.org', '90minut.pl']
+
+UNKNOWN_VALUES = {'', 'nieznana', 'nieznana druzyna', 'nieznany zawodnik'}
+
+# Reports of one transfer may be dated days apart (signing vs. announcement)
+DATE_WINDOW = 30
+
+# Minimum similarity between differing first names, after folding
+GIVEN_NAME_SIMILARITY = 0.8
+
+_LETTERS = str.maketrans({'ł': 'l', 'Ł': 'L'})
+
+@lru_cache(maxsize=8192)
+def fold(text):
+    """Lowercase text and strip diacritics, so 'Łukasz' and 'lukasz' compare equal"""
+    text = unicodedata.normalize('NFKD', (text or '').translate(_LETTERS))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().replace('.', ' ').split())
+
+def is_unknown(value):
+    return not isinstance(value, str) or fold(value) in UNKNOWN_VALUES
+
+def source_priority(name):
+    """Rank of a source name; lower wins, unlisted sources come last"""
+    if name and name.endswith(OFFICIAL_SUFFIX):
+        name = OFFICIAL_SOURCE
+    try:
+        return SOURCE_PRIORITY.index(name)
+    except ValueError:
+        return len(SOURCE_PRIORITY)
+
+def record_sources(transfer):
+    """Sources a record was built from, as a list of {'name', 'url'}"""
+    if transfer.get('sources'):
+        return transfer['sources']
+    return [{'name': transfer.get('sourceName', ''), 'url': transfer.get('sourceUrl', '')}]
+
+def _day(value):
+    try:
+        return date.fromisoformat(value).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+def _names_match(a, b):
+    """Compare two folded names already known to share a surname"""
+    given_a, given_b = a.split()[:-1], b.split()[:-1]
+    if not given_a or not given_b:
+        return True
+
+    first_a, first_b = given_a[0], given_b[0]
+    if first_a == first_b:
+        return True
+    # "J. Kowalski" vs "Jan Kowalski"
+    if min(len(first_a), len(first_b)) == 1:
+        return first_a[0] == first_b[0]
+    return SequenceMatcher(None, first_a, first_b).ratio() >= GIVEN_NAME_SIMILARITY
+
+def _teams_match(a, b):
+    """Clubs agree if either side is unknown or one name's words contain the other's
+
+    Whole words only: 'Lech' matches 'Lech Poznań' but not 'Lechia Gdańsk'.
+    """
+    if is_unknown(a) or is_unknown(b):
+        return True
+    a, b = set(re.findall(r'\w+', fold(a))), set(re.findall(r'\w+', fold(b)))
+    return a <= b or b <= a
+
+def surname(name):
+    """Folded surname used as the blocking key, or None for unknown players"""
+    if is_unknown(name):
+        return None
+    return fold(name).split()[-1]
+
+def same_player(a, b):
+    """Check two player names could be the same person"""
+    a, b = fold(a), fold(b)
+    return a.split()[-1:] == b.split()[-1:] and _names_match(a, b)
+
+def same_transfer(a, b, window=DATE_WINDOW):
+    """Check two records could report the same transfer"""
+    day_a, day_b = _day(a.get('transferDate')), _day(b.get('transferDate'))
+    if day_a is not None and day_b is not None and abs(day_a - day_b) > window:
+        return False
+    if is_unknown(a.get('playerName')) or is_unknown(b.get('playerName')):
+        return False
+    return (same_player(a['playerName'], b['playerName'])
+            and _teams_match(a.get('fromTeam'), b.get('fromTeam'))
+            and _teams_match(a.get('toTeam'), b.get('toTeam')))
+
+def merge_records(records):
+    """Merge reports of one transfer; each field comes from the best source that knows it"""
+    # sorted() is stable, so earlier records win between equal sources
+    ranked = sorted(records, key=lambda t: source_priority(t.get('sourceName')))
+    merged = dict(ranked[0])
+    for transfer in ranked[1:]:
+        for key, value in transfer.items():
+            if key not in merged or (is_unknown(merged[key]) and not is_unknown(value)):
+                merged[key] = value
+
+    sources, seen = [], set()
+    for transfer in ranked:
+        for source in record_sources(transfer):
+            key = (source.get('name'), source.get('url'))
+            if key not in seen:
+                seen.add(key)
+                sources.append(source)
+    merged['sources'] = sources
+    # Amount and category always follow the fee text that won
+    return with_fee(merged)
+
+class Cluster:
+    """Reports believed to describe one transfer"""
+
+    def __init__(self, transfer):
+        self.members = [transfer]
+        self.days = {_day(transfer.get('transferDate'))}
+        self.merged = None
+
+    def add(self, transfer):
+        self.members.append(transfer)
+        self.days.add(_day(transfer.get('transferDate')))
+        self.merged = None
+
+    def near(self, day, window):
+        if day is None or None in self.days:
+            return True
+        return any(abs(day - other) <= window for other in self.days)
+
+    def matches(self, transfer, name):
+        record = self.record()
+        return (_names_match(fold(record['playerName']), name)
+                and _teams_match(record.get('fromTeam'), transfer.get('fromTeam'))
+                and _teams_match(record.get('toTeam'), transfer.get('toTeam')))
+
+    def record(self):
+        if self.merged is None:
+            self.merged = merge_records(self.members)
+        return self.merged
+
+class FuzzyDeduplicator:
+    """Streaming dedupe stage merging near-duplicate transfers
+
+    Records are blocked by folded surname and a date bucket DATE_WINDOW days
+    wide, so each new record is only scored against the few clusters in its
+    own and the neighbouring buckets rather than against every record seen.
+    """
+
+    def __init__(self, window=DATE_WINDOW):
+        self.window = window
+        self.clusters = []
+        self.blocks = {}
+
+    def _candidates(self, block, day):
+        buckets = self.blocks.get(block)
+        if not buckets:
+            return
+        if day is None:
+            keys = list(buckets)
+        else:
+            bucket = day // self.window
+            keys = [bucket - 1, bucket, bucket + 1, None]
+        for key in keys:
+            yield from buckets.get(key, ())
+
+    def add(self, transfer):
+        """Add a record; returns False if it merged into an existing transfer"""
+        day = _day(transfer.get('transferDate'))
+
+        if is_unknown(transfer.get('playerName')):
+            # Nothing to block on: only identical clubs and date merge
+            block = ('?', fold(transfer.get('fromTeam')), fold(transfer.get('toTeam')),
+                       transfer.get('transferDate'))
+            name = ''
+        else:
+            name = fold(transfer['playerName'])
+            block = surname(name)
+
+        for index in self._candidates(block, day):
+            cluster = self.clusters[index]
+            if cluster.near(day, self.window) and (not name or cluster.matches(transfer, name)):
+                cluster.add(transfer)
+                return False
+
+        bucket = None if day is None else day // self.window
+        self.blocks.setdefault(block, {}).setdefault(bucket, []).append(len(self.clusters))
+        self.clusters.append(Cluster(transfer))
+        return True
+
+    @property
+    def records(self):
+        return [cluster.record() for cluster in self.clusters]
+
+def deduplicate(transfers, window=DATE_WINDOW):
+    """Merge duplicate transfers, keeping first-seen order"""
+    deduplicator = FuzzyDeduplicator(window)
+    for transfer in transfers:
+        deduplicator.add(transfer)
+    return deduplicator.records
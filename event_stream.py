@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Server-Sent Events broadcaster for the API server
+One selector thread fans events out to every connected client
+"""
+
+import json
+import selectors
+import socket
+import threading
+import time
+from collections import deque
+
+class SSEBroadcaster:
+    """Push events to many idle SSE connections without a thread per client
+
+    Request handlers write the response headers and then hand their socket
+    over with attach(). From then on the socket belongs to a single
+    selector loop, which appends published frames to each client's buffer
+    and writes them as the socket accepts data. Clients that fall too far
+    behind are dropped; browsers reconnect and resume with Last-Event-ID.
+    """
+
+    def __init__(self, history=1000, heartbeat=15, max_buffer=1 << 20):
+        self.heartbeat = heartbeat
+        self.max_buffer = max_buffer
+
+        # Event ids are "<epoch>-<n>"; an id from an earlier server process
+        # cannot be resumed and gets the current state instead
+        self.epoch = format(int(time.time()), 'x')
+        self.counter = 0
+        self.history = deque(maxlen=history)
+        self.state_frame = None
+
+        self.lock = threading.Lock()
+        self.pending = []
+        self.outbox = []
+
+        # Owned by the loop thread
+        self.clients = {}
+        self.selector = selectors.DefaultSelector()
+        self._wake_read, self._wake_write = socket.socketpair()
+        self._wake_read.setblocking(False)
+        self._wake_write.setblocking(False)
+        self.selector.register(self._wake_read, selectors.EVENT_READ)
+
+        self.thread = threading.Thread(target=self._loop, name='sse-broadcaster', daemon=True)
+        self.thread.start()
+
+    def publish(self, event, data, state=False):
+        """Queue an event for every client; state events are also sent on (re)connect"""
+        with self.lock:
+            self.counter += 1
+            event_id = f'{self.epoch}-{self.counter}'
+            payload = json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+            frame = f'id: {event_id}\nevent: {event}\ndata: {payload}\n\n'.encode('utf-8')
+
+            self.history.append((self.counter, frame))
+            self.outbox.append((self.counter, frame))
+            if state:
+                self.state_frame = frame
+        self._wake()
+
+    def attach(self, sock, last_event_id=None):
+        """Take over a socket whose SSE response headers were already sent"""
+        with self.lock:
+            backlog = [b'retry: 5000\n\n'] + self._backlog(last_event_id)
+            self.pending.append((sock, self.counter, b''.join(backlog)))
+        self._wake()
+
+    def _backlog(self, last_event_id):
+        # Caller must hold self.lock
+        epoch, _, number = (last_event_id or '').partition('-')
+        if epoch == self.epoch and number.isdigit():
+            seen = int(number)
+            oldest = self.history[0][0] if self.history else self.counter + 1
+            if seen >= oldest - 1:
+                return [frame for n, frame in self.history if n > seen]
+        # New client, or one that missed more than we remember
+        return [self.state_frame] if self.state_frame else []
+
+    def _wake(self):
+        try:
+            self._wake_write.send(b'\0')
+        except (BlockingIOError, OSError):
+            pass  # A wake-up is already pending
+
+    def _loop(self):
+        last_heartbeat = time.monotonic()
+        while True:
+            for key, mask in self.selector.select(timeout=self.heartbeat):
+                sock = key.fileobj
+                if sock is self._wake_read:
+                    try:
+                        while sock.recv(4096):
+                            pass
+                    except BlockingIOError:
+                        pass
+                elif mask & selectors.EVENT_READ and not self._readable(sock):
+                    self._drop(sock)
+                elif mask & selectors.EVENT_WRITE:
+                    self._flush(sock)
+
+            with self.lock:
+                pending, self.pending = self.pending, []
+                outbox, self.outbox = self.outbox, []
+
+            for sock, since, backlog in pending:
+                sock.setblocking(False)
+                self.clients[sock] = [bytearray(backlog), since]
+                self.selector.register(sock, selectors.EVENT_READ)
+
+            touched = {sock for sock, _, _ in pending}
+            for number, frame in outbox:
+                for sock, (buffer, since) in self.clients.items():
+                    # Clients attached after this event already got it in their backlog
+                    if number > since:
+                        buffer += frame
+                        touched.add(sock)
+
+            if time.monotonic() - last_heartbeat >= self.heartbeat:
+                last_heartbeat = time.monotonic()
+                for sock, (buffer, _) in self.clients.items():
+                    buffer += b': ping\n\n'
+                    touched.add(sock)
+
+            for sock in touched:
+                if sock in self.clients:
+                    self._flush(sock)
+
+    def _readable(self, sock):
+        """Consume client input; returns False once the client has gone away"""
+        try:
+            return bool(sock.recv(1024))
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+
+    def _flush(self, sock):
+        buffer = self.clients[sock][0]
+        try:
+            sent = sock.send(buffer)
+            del buffer[:sent]
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._drop(sock)
+            return
+
+        if len(buffer) > self.max_buffer:
+            self._drop(sock)
+            return
+
+        events = selectors.EVENT_READ | (selectors.EVENT_WRITE if buffer else 0)
+        self.selector.modify(sock, events)
+
+    def _drop(self, sock):
+        self.clients.pop(sock, None)
+        try:
+            self.selector.unregister(sock)
+        except (KeyError, ValueError):
+            pass
+        sock.close()
+
+    def connections(self):
+        return len(self.clients)
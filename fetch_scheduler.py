@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Concurrent fetch scheduler for the transfer scrapers
+Runs page downloads in parallel while keeping each host's load polite
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlparse
+
+class TokenBucket:
+    """Thread-safe token bucket limiting how often a host is hit"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        """Take a token if one is available; return 0, or else the seconds until one is"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+            return (1 - self.tokens) / self.rate
+
+class FetchScheduler:
+    """Schedule page fetches across hosts with per-host and global limits
+
+    fetch is called as fetch(url, timeout=...) on a worker thread. Each host
+    gets at most per_host requests in flight and rate requests per second;
+    max_workers caps the total number of concurrent requests. Requests queued
+    for a busy or rate-limited host wait in that host's queue rather than
+    occupying a worker: a host out of tokens is dispatched again by a timer
+    when its next token is due. A slow host never starves the others.
+    """
+
+    def __init__(self, fetch, max_workers=8, per_host=2, rate=2.0, burst=2, timeout=10):
+        self._fetch = fetch
+        self.per_host = per_host
+        self.rate = rate
+        self.burst = burst
+        self.timeout = timeout
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix='fetch')
+        self._lock = threading.Lock()
+        self._queues = {}
+        self._active = {}
+        self._buckets = {}
+        self._timers = {}
+        # Notified whenever a fetch finishes, for shutdown()
+        self._finished = threading.Condition(self._lock)
+
+    def submit(self, url):
+        """Queue a fetch and return a Future for its result"""
+        host = urlparse(url).netloc.lower()
+        future = Future()
+
+        with self._lock:
+            if host not in self._queues:
+                self._queues[host] = deque()
+                self._active[host] = 0
+                self._buckets[host] = TokenBucket(self.rate, self.burst)
+            self._queues[host].append((url, future))
+            self._dispatch(host)
+
+        return future
+
+    def fetch(self, url):
+        """Fetch a single page through the scheduler and wait for it"""
+        return self.submit(url).result()
+
+    def _dispatch(self, host):
+        # Caller must hold self._lock
+        queue = self._queues[host]
+        while queue and self._active[host] < self.per_host:
+            if queue[0][1].cancelled():
+                queue.popleft()
+                continue
+
+            wait = self._buckets[host].take()
+            if wait:
+                # Come back when the next token is due instead of sleeping on a worker
+                if host not in self._timers:
+                    timer = threading.Timer(wait, self._wake, (host,))
+                    timer.daemon = True
+                    self._timers[host] = timer
+                    timer.start()
+                return
+
+            url, future = queue.popleft()
+            if not future.set_running_or_notify_cancel():
+                continue
+            self._active[host] += 1
+            self._executor.submit(self._run, host, url, future)
+
+    def _wake(self, host):
+        with self._lock:
+            del self._timers[host]
+            self._dispatch(host)
+
+    def _run(self, host, url, future):
+        try:
+            future.set_result(self._fetch(url, timeout=self.timeout))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._active[host] -= 1
+                self._dispatch(host)
+                self._finished.notify_all()
+
+    def _pending(self):
+        return any(self._queues.values()) or any(self._active.values())
+
+    def shutdown(self):
+        """Stop the worker threads once queued fetches finish"""
+        with self._lock:
+            while self._pending():
+                self._finished.wait()
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+HTML parsing helpers for the BeautifulSoup based scrapers
+Uses the lxml backend and only builds the parts of a page we actually read
+"""
+
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+# Elements holding the article body, in order of preference
+CONTENT_TAGS = ['article', 'main']
+
+# Article pages: the body container plus whatever carries the publication date
+ARTICLE_STRAINER = SoupStrainer(CONTENT_TAGS + ['time', 'span'])
+
+# Opening tag of a content container, looked for before choosing how to parse
+_CONTAINER = r'<(?:' + '|'.join(CONTENT_TAGS) + r')[\s/>]'
+_CONTAINER_TEXT = re.compile(_CONTAINER, re.IGNORECASE)
+_CONTAINER_BYTES = re.compile(_CONTAINER.encode('ascii'), re.IGNORECASE)
+
+def parse_html(content, only=None):
+    """Parse a page, optionally keeping only elements matched by a SoupStrainer"""
+    return BeautifulSoup(content, PARSER, parse_only=only)
+
+def parse_listing(content, name, fallback_name=None, fallback_class=None):
+    """Parse the item elements of a listing page
+
+    Returns the matching elements for name, or for fallback_name/fallback_class
+    when the page has none of the first kind.
+    """
+    items = parse_html(content, SoupStrainer(name)).find_all(name)
+    if items or not fallback_name:
+        return items
+
+    strainer = SoupStrainer(fallback_name, class_=fallback_class)
+    return parse_html(content, strainer).find_all(fallback_name, class_=fallback_class)
+
+def parse_article(content):
+    """Parse an article page into (soup, body_text)
+
+    The text comes from the content container rather than the whole document,
+    so navigation, sidebars and footers do not leak into keyword matching.
+    Pages without a container are parsed once, in full.
+    """
+    pattern = _CONTAINER_BYTES if isinstance(content, bytes) else _CONTAINER_TEXT
+    if pattern.search(content):
+        soup = parse_html(content, ARTICLE_STRAINER)
+        for tag in CONTENT_TAGS:
+            container = soup.find(tag)
+            if container:
+                return soup, container.get_text(' ', strip=True)
+
+    # No recognisable container; fall back to the full document text
+    full_soup = parse_html(content)
+    return full_soup, full_soup.get_text(' ', strip=True)
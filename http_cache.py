@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+On-disk HTTP cache shared by the transfer scrapers
+Stores page bodies with their validators so daily runs can use conditional GETs
+"""
+
+import hashlib
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+from datetime import datetime
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.http_cache')
+
+class HTTPCache:
+    """URL-keyed cache of page bodies, ETags and Last-Modified dates"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _paths(self, url):
+        key = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        base = os.path.join(self.directory, key)
+        return base + '.json', base + '.body'
+
+    def _write(self, path, data):
+        # Write to a temp file first so a crash never leaves half an entry
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def load_meta(self, url):
+        """Get the stored metadata for a URL, or None"""
+        meta_path, _ = self._paths(url)
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def save_meta(self, url, meta):
+        meta_path, _ = self._paths(url)
+        self._write(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+    def load_body(self, url):
+        """Get the cached body for a URL, or None"""
+        _, body_path = self._paths(url)
+        try:
+            with open(body_path, 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def conditional_headers(self, url):
+        """Build If-None-Match / If-Modified-Since headers for a cached URL"""
+        meta = self.load_meta(url)
+        if not meta or self.load_body(url) is None:
+            return {}
+
+        headers = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+        return headers
+
+    def store(self, url, body, etag=None, last_modified=None):
+        """Save a freshly downloaded body and its validators"""
+        _, body_path = self._paths(url)
+        self._write(body_path, body)
+
+        meta = self.load_meta(url) or {'url': url}
+        meta.update({
+            'etag': etag,
+            'last_modified': last_modified,
+            'fetched': datetime.now().isoformat(timespec='seconds'),
+        })
+        self.save_meta(url, meta)
+
+    def get(self, session, url, timeout=10):
+        """Fetch a URL with a requests session, revalidating any cached copy"""
+        response = session.get(url, headers=self.conditional_headers(url), timeout=timeout)
+
+        if response.status_code == 304:
+            body = self.load_body(url)
+            if body is not None:
+                return body
+            # Cache entry vanished between the check and now; fetch it fully
+            response = session.get(url, timeout=timeout)
+
+        response.raise_for_status()
+        self.store(url, response.content,
+                   response.headers.get('ETag'), response.headers.get('Last-Modified'))
+        return response.content
+
+    def urlopen(self, url, headers=None, timeout=10):
+        """Fetch a URL with urllib, revalidating any cached copy"""
+        return b''.join(self.stream(url, headers, timeout))
+
+    def stream(self, url, headers=None, timeout=10, chunk_size=64 * 1024):
+        """Yield the body of a URL in chunks as they arrive, revalidating any cached copy
+
+        The body is cached once it has been read completely.
+        """
+        request_headers = dict(headers or {})
+        request_headers.update(self.conditional_headers(url))
+        req = urllib.request.Request(url, headers=request_headers)
+
+        try:
+            response = urllib.request.urlopen(req, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                body = self.load_body(url)
+                if body is not None:
+                    yield body
+                    return
+            raise
+
+        with response:
+            chunks = []
+            while True:
+                # read1 returns what has arrived instead of waiting for chunk_size bytes
+                chunk = response.read1(chunk_size)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+                yield chunk
+            self.store(url, b''.join(chunks),
+                       response.headers.get('ETag'), response.headers.get('Last-Modified'))
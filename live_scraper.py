@@ -2,25 +2,51 @@
 """
 Real Web Scraper for Ekstraklasa Transfers
 Pulls actual transfer data from football websites
-Uses requests and BeautifulSoup for reliable scraping
+Uses requests and BeautifulSoup (lxml backend) for reliable scraping
 """
 
 import requests
-from bs4 import BeautifulSoup
-import json
-import re
-from datetime import datetime, timedelta
+from bs4 import SoupStrainer
 from urllib.parse import urljoin, urlparse
-import time
+from concurrent.futures import as_completed
+
+from article_store import ArticleStore, content_hash
+from date_parsing import DateNormalizer
+from deduplication import deduplicate
+from fetch_scheduler import FetchScheduler
+from html_parsing import parse_article, parse_html, parse_listing
+from http_cache import HTTPCache
+from pipeline import Page, PageSource, Pipeline, Source, SourceRegistry
+from team_matching import matcher as team_matcher
+from transfer_classification import classify_transfer
+from transfer_db import TransferDatabase
+
+# Source plugins run by RealTransferScraper.run()
+sources = SourceRegistry()
 
 class RealTransferScraper:
-    def __init__(self):
+    def __init__(self, max_workers=8, per_host=2, rate=2.0, cache=None, articles=None,
+                 database=None):
         self.transfers = []
+        self.dates = DateNormalizer()
         self.session = requests.Session()
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         })
         
+        # Pages are revalidated against the on-disk cache between runs
+        self.cache = cache or HTTPCache()
+        
+        # Articles processed on earlier runs are only re-read when they change
+        self.articles = articles or ArticleStore()
+        
+        # Every transfer ever found; transfers.json is exported from it
+        self.database = database or TransferDatabase()
+        
+        # Different hosts are fetched in parallel, each one rate limited
+        self.scheduler = FetchScheduler(self.get_page, max_workers=max_workers,
+                                        per_host=per_host, rate=rate)
+        
         # Ekstraklasa teams for filtering
         self.ekstraklasa_teams = {
             'Legia Warszawa', 'Lech Poznań', 'Wisła Kraków', 'Lechia Gdańsk',
@@ -30,91 +56,73 @@ class RealTransferScraper:
             'Wisła Płock', 'ŁKS Łódź', 'Zagłębie Lubin'
         }
     
-    def scrape_90minut_news(self):
-        """Scrape transfer news from 90minut.pl"""
-        print("Scraping 90minut.pl for transfer news...")
+    def get_page(self, url, timeout=10):
+        """Download a page body, raising for HTTP errors"""
+        return self.cache.get(self.session, url, timeout=timeout)
+    
+    def fetch(self, url):
+        """Fetch a page through the scheduler and wait for it"""
+        return self.scheduler.fetch(url)
+    
+    def list_90minut_articles(self, content, url):
+        """Find transfer-related news articles on the 90minut.pl front page"""
+        # Look for news articles with transfer keywords
+        news_items = parse_listing(content, 'article', 'div', 'news-item')
+        
+        transfer_keywords = [
+            'transfer', 'przenosi się', 'dołącza', 'odejdzie', 'wypożyczony',
+            'transferuje', 'sprzedany', 'kupiony', 'kontrakt'
+        ]
         
-        try:
-            # Main news page
-            url = "https://www.90minut.pl"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for news articles with transfer keywords
-            news_items = soup.find_all('article') or soup.find_all('div', class_='news-item')
-            
-            transfer_keywords = [
-                'transfer', 'przenosi się', 'dołącza', 'odejdzie', 'wypożyczony',
-                'transferuje', 'sprzedany', 'kupiony', 'kontrakt'
-            ]
-            
-            for item in news_items:
-                try:
-                    title_elem = item.find('h2') or item.find('h3') or item.find('a')
-                    if not title_elem:
-                        continue
-                    
-                    title = title_elem.get_text(strip=True)
-                    
-                    # Check if it's transfer-related
-                    if not any(keyword in title.lower() for keyword in transfer_keywords):
-                        continue
-                    
-                    link_elem = item.find('a')
-                    if not link_elem or not link_elem.get('href'):
-                        continue
-                    
-                    link = urljoin(url, link_elem['href'])
-                    
-                    # Get article details
-                    transfer = self.extract_90minut_transfer(link, title)
-                    if transfer:
-                        self.transfers.append(transfer)
-                    
-                    # Be respectful to server
-                    time.sleep(0.5)
-                    
-                except Exception as e:
-                    print(f"Error parsing news item: {e}")
+        articles = []
+        for item in news_items:
+            try:
+                title_elem = item.find('h2') or item.find('h3') or item.find('a')
+                if not title_elem:
                     continue
-            
-        except Exception as e:
-            print(f"Error scraping 90minut.pl: {e}")
+                
+                title = title_elem.get_text(strip=True)
+                
+                # Check if it's transfer-related
+                if not any(keyword in title.lower() for keyword in transfer_keywords):
+                    continue
+                
+                link_elem = item.find('a')
+                if not link_elem or not link_elem.get('href'):
+                    continue
+                
+                link = urljoin(url, link_elem['href'])
+                articles.append((link, title))
+                
+            except Exception as e:
+                print(f"Error parsing news item: {e}")
+                continue
+        
+        return articles
     
-    def extract_90minut_transfer(self, url, title):
+    def extract_90minut_transfer(self, url, title, content):
         """Extract transfer details from 90minut article"""
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Extract transfer details from the article body only
+            soup, article_text = parse_article(content)
             
             # Extract player name
             player_name = self.extract_player_name(title)
             
-            # Extract transfer details from article text
-            article_text = soup.get_text()
-            
-            # Determine transfer type
-            transfer_type = self.determine_transfer_type(title + ' ' + article_text)
+            # Determine transfer type and fee in one pass
+            transfer_type, fee, _ = classify_transfer(title + ' ' + article_text)
             
             # Extract teams
             teams = self.extract_teams_from_text(title + ' ' + article_text)
             
-            # Extract fee
-            fee = self.extract_fee_from_text(article_text)
-            
             # Extract date
             date_elem = soup.find('time') or soup.find('span', class_='date')
             if date_elem:
                 transfer_date = self.parse_date(date_elem.get_text())
             else:
-                transfer_date = datetime.now().strftime('%Y-%m-%d')
+                transfer_date = self.dates.today
             
             transfer = {
-                'id': len(self.transfers) + 1,
                 'playerName': player_name,
                 'type': transfer_type,
                 'fromTeam': teams.get('from', 'Nieznana'),
@@ -132,150 +140,117 @@ class RealTransferScraper:
             print(f"Error extracting transfer from {url}: {e}")
             return None
     
-    def scrape_transfermarkt_ekstraklasa(self):
-        """Scrape Ekstraklasa transfers from Transfermarkt"""
-        print("Scraping Transfermarkt.pl for Ekstraklasa transfers...")
+    def parse_transfermarkt(self, content, url):
+        """Parse Ekstraklasa transfers from the Transfermarkt table"""
+        soup = parse_html(content, SoupStrainer('table', class_='items'))
         
-        try:
-            url = "https://www.transfermarkt.pl/ekstraklasa/transfers/wettbewerb/PL1"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Find transfer table
-            table = soup.find('table', class_='items')
-            if not table:
-                print("Transfer table not found on Transfermarkt")
-                return
-            
-            rows = table.find_all('tr')
-            
-            for row in rows[1:]:  # Skip header
-                try:
-                    cells = row.find_all('td')
-                    if len(cells) < 6:
-                        continue
-                    
-                    # Extract player name
-                    player_cell = cells[0]
-                    player_link = player_cell.find('a')
-                    if not player_link:
-                        continue
-                    
-                    player_name = player_link.get_text(strip=True)
-                    
-                    # Extract clubs
-                    from_cell = cells[3]
-                    to_cell = cells[4]
-                    
-                    from_team = from_cell.get_text(strip=True)
-                    to_team = to_cell.get_text(strip=True)
-                    
-                    # Only include if at least one is Ekstraklasa team
-                    if (from_team not in self.ekstraklasa_teams and 
-                        to_team not in self.ekstraklasa_teams):
-                        continue
-                    
-                    # Extract fee
-                    fee_cell = cells[5] if len(cells) > 5 else None
-                    fee = fee_cell.get_text(strip=True) if fee_cell else 'Nieznana'
-                    
-                    # Extract date
-                    date_cell = cells[2] if len(cells) > 2 else None
-                    date_str = date_cell.get_text(strip=True) if date_cell else ''
-                    
-                    transfer_date = self.parse_date(date_str)
-                    
-                    # Determine transfer type
-                    transfer_type = 'in' if to_team in self.ekstraklasa_teams else 'out'
-                    
-                    transfer = {
-                        'id': len(self.transfers) + 1,
-                        'playerName': player_name,
-                        'type': transfer_type,
-                        'fromTeam': from_team,
-                        'toTeam': to_team,
-                        'transferDate': transfer_date,
-                        'fee': fee,
-                        'summary': f'{player_name}: {from_team} → {to_team}',
-                        'sourceUrl': url,
-                        'sourceName': 'Transfermarkt.pl'
-                    }
-                    
-                    self.transfers.append(transfer)
-                    
-                except Exception as e:
-                    print(f"Error parsing Transfermarkt row: {e}")
+        # Find transfer table
+        table = soup.find('table', class_='items')
+        if not table:
+            print("Transfer table not found on Transfermarkt")
+            return
+        
+        rows = table.find_all('tr')
+        
+        for row in rows[1:]:  # Skip header
+            try:
+                cells = row.find_all('td')
+                if len(cells) < 6:
                     continue
-            
-        except Exception as e:
-            print(f"Error scraping Transfermarkt: {e}")
+                
+                # Extract player name
+                player_cell = cells[0]
+                player_link = player_cell.find('a')
+                if not player_link:
+                    continue
+                
+                player_name = player_link.get_text(strip=True)
+                
+                # Extract clubs
+                from_cell = cells[3]
+                to_cell = cells[4]
+                
+                from_team = from_cell.get_text(strip=True)
+                to_team = to_cell.get_text(strip=True)
+                
+                # Only include if at least one is Ekstraklasa team
+                if (from_team not in self.ekstraklasa_teams and 
+                    to_team not in self.ekstraklasa_teams):
+                    continue
+                
+                # Extract fee
+                fee_cell = cells[5] if len(cells) > 5 else None
+                fee = fee_cell.get_text(strip=True) if fee_cell else 'Nieznana'
+                
+                # Extract date
+                date_cell = cells[2] if len(cells) > 2 else None
+                date_str = date_cell.get_text(strip=True) if date_cell else ''
+                
+                transfer_date = self.parse_date(date_str)
+                
+                # Determine transfer type
+                transfer_type = 'in' if to_team in self.ekstraklasa_teams else 'out'
+                
+                yield {
+                    'playerName': player_name,
+                    'type': transfer_type,
+                    'fromTeam': from_team,
+                    'toTeam': to_team,
+                    'transferDate': transfer_date,
+                    'fee': fee,
+                    'summary': f'{player_name}: {from_team} → {to_team}',
+                    'sourceUrl': url,
+                    'sourceName': 'Transfermarkt.pl'
+                }
+                
+            except Exception as e:
+                print(f"Error parsing Transfermarkt row: {e}")
+                continue
     
-    def scrape_ekstraklasa_org(self):
-        """Scrape transfers from official Ekstraklasa site"""
-        print("Scraping Ekstraklasa.org...")
+    def list_ekstraklasa_org_articles(self, content, url):
+        """Find transfer articles on the Ekstraklasa.org transfer page"""
+        # Look for transfer news
+        items = parse_listing(content, 'article', 'div', 'transfer-item')
         
-        try:
-            url = "https://ekstraklasa.org/transfery/"
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Look for transfer news
-            articles = soup.find_all('article') or soup.find_all('div', class_='transfer-item')
-            
-            for article in articles:
-                try:
-                    title_elem = article.find('h2') or article.find('h3')
-                    if not title_elem:
-                        continue
-                    
-                    title = title_elem.get_text(strip=True)
-                    
-                    link_elem = article.find('a')
-                    if not link_elem or not link_elem.get('href'):
-                        continue
-                    
-                    link = urljoin(url, link_elem['href'])
-                    
-                    # Extract transfer details
-                    transfer = self.extract_ekstraklasa_org_transfer(link, title)
-                    if transfer:
-                        self.transfers.append(transfer)
-                    
-                    time.sleep(0.5)
-                    
-                except Exception as e:
-                    print(f"Error parsing Ekstraklasa.org article: {e}")
+        articles = []
+        for article in items:
+            try:
+                title_elem = article.find('h2') or article.find('h3')
+                if not title_elem:
                     continue
-            
-        except Exception as e:
-            print(f"Error scraping Ekstraklasa.org: {e}")
+                
+                title = title_elem.get_text(strip=True)
+                
+                link_elem = article.find('a')
+                if not link_elem or not link_elem.get('href'):
+                    continue
+                
+                link = urljoin(url, link_elem['href'])
+                articles.append((link, title))
+                
+            except Exception as e:
+                print(f"Error parsing Ekstraklasa.org article: {e}")
+                continue
+        
+        return articles
     
-    def extract_ekstraklasa_org_transfer(self, url, title):
+    def extract_ekstraklasa_org_transfer(self, url, title, content):
         """Extract transfer from Ekstraklasa.org article"""
         try:
-            response = self.session.get(url, timeout=10)
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup, article_text = parse_article(content)
             
             player_name = self.extract_player_name(title)
             transfer_type = self.determine_transfer_type(title)
             
-            article_text = soup.get_text()
             teams = self.extract_teams_from_text(title + ' ' + article_text)
             fee = self.extract_fee_from_text(article_text)
             
             transfer = {
-                'id': len(self.transfers) + 1,
                 'playerName': player_name,
                 'type': transfer_type,
                 'fromTeam': teams.get('from', 'Nieznana'),
                 'toTeam': teams.get('to', 'Nieznana'),
-                'transferDate': datetime.now().strftime('%Y-%m-%d'),
+                'transferDate': self.dates.today,
                 'fee': fee,
                 'summary': title,
                 'sourceUrl': url,
@@ -306,133 +281,34 @@ class RealTransferScraper:
     
     def determine_transfer_type(self, text):
         """Determine transfer type from text"""
-        text_lower = text.lower()
-        
-        outgoing = ['opuszcza', 'odchodzi', 'sprzedany', 'wypożyczony', 'żegna się', 'transfer do']
-        incoming = ['dołącza', 'podpisuje', 'przychodzi', 'zatrudnia', 'transfer z', 'nowym zawodnikiem']
-        
-        for keyword in outgoing:
-            if keyword in text_lower:
-                return 'out'
-        
-        for keyword in incoming:
-            if keyword in text_lower:
-                return 'in'
-        
-        return 'in'  # Default
+        return classify_transfer(text).type
     
     def extract_teams_from_text(self, text):
         """Extract team names from text"""
-        teams = {'from': None, 'to': None}
-        
-        text_lower = text.lower()
-        
-        # Look for Ekstraklasa teams in text
-        for team in self.ekstraklasa_teams:
-            if team.lower() in text_lower:
-                # Check context to determine from/to
-                if any(word in text_lower for word in ['do ' + team.lower(), team.lower() + ' dołącza', 'transfer do ' + team.lower()]):
-                    teams['to'] = team
-                elif any(word in text_lower for word in ['z ' + team.lower(), team.lower() + ' opuszcza', team.lower() + ' sprzedany']):
-                    teams['from'] = team
-        
-        return teams
+        # Context words around each mention decide from/to
+        return team_matcher.classify(text)
     
     def extract_fee_from_text(self, text):
         """Extract transfer fee from text"""
-        # Fee patterns
-        patterns = [
-            r'(\d+\.?\d*)\s*m(?:ilion)?\s*€',  # X.X million euros
-            r'(\d+)\s*tys(?:iąc|.)?\s*€',  # X thousand euros
-            r'bezpłatnie',  # free
-            r'wolny.*agent',  # free agent
-            r'wypożyczenie',  # loan
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text, re.IGNORECASE)
-            if match:
-                if 'bezpłatnie' in pattern or 'wolny' in pattern:
-                    return 'Bez opłaty'
-                elif 'wypożyczenie' in pattern:
-                    return 'Wypożyczenie'
-                else:
-                    return match.group(0)
-        
-        return 'Nieznana'
+        return classify_transfer(text).fee
     
     def parse_date(self, date_str):
         """Parse various date formats"""
-        if not date_str:
-            return datetime.now().strftime('%Y-%m-%d')
-        
-        # Common formats
-        formats = [
-            '%d.%m.%Y', '%d.%m.%y',
-            '%d/%m/%Y', '%d/%m/%y',
-            '%d-%m-%Y', '%d-%m-%y',
-            '%Y-%m-%d'
-        ]
-        
-        date_str = date_str.strip()
-        
-        for fmt in formats:
-            try:
-                return datetime.strptime(date_str, fmt).strftime('%Y-%m-%d')
-            except ValueError:
-                continue
-        
-        # Try to extract today/yesterday/tomorrow
-        date_str_lower = date_str.lower()
-        if 'dzisiaj' in date_str_lower or 'today' in date_str_lower:
-            return datetime.now().strftime('%Y-%m-%d')
-        elif 'wczoraj' in date_str_lower or 'yesterday' in date_str_lower:
-            return (datetime.now() - timedelta(days=1)).strftime('%Y-%m-%d')
-        
-        return datetime.now().strftime('%Y-%m-%d')
+        return self.dates.normalize(date_str)
     
     def deduplicate_transfers(self):
         """Remove duplicate transfers"""
-        seen = set()
-        unique_transfers = []
-        
-        for transfer in self.transfers:
-            # Create unique key
-            key = f"{transfer['playerName'].lower()}-{transfer['fromTeam']}-{transfer['toTeam']}"
-            
-            if key not in seen:
-                seen.add(key)
-                unique_transfers.append(transfer)
-        
-        return unique_transfers
+        return deduplicate(self.transfers)
+    
+    def collect(self, transfers):
+        """Pipeline sink: keep the freshly scraped transfers"""
+        self.transfers = transfers
+        return transfers
     
     def save_transfers(self, filename='transfers.json'):
-        """Save transfers to JSON"""
-        # Remove duplicates
-        self.transfers = self.deduplicate_transfers()
-        
-        # Sort by date
-        self.transfers.sort(key=lambda x: x.get('transferDate', ''), reverse=True)
-        
-        # Limit to recent transfers
-        cutoff_date = datetime.now() - timedelta(days=90)  # Last 3 months
-        recent_transfers = []
-        
-        for transfer in self.transfers:
-            try:
-                transfer_date = datetime.strptime(transfer['transferDate'], '%Y-%m-%d')
-                if transfer_date >= cutoff_date:
-                    recent_transfers.append(transfer)
-            except:
-                recent_transfers.append(transfer)
-        
-        # Limit to 50 most recent
-        self.transfers = recent_transfers[:50]
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.transfers, f, ensure_ascii=False, indent=2)
-        
-        print(f"Saved {len(self.transfers)} unique transfers to {filename}")
+        """Store transfers in the database and export recent ones to JSON"""
+        # The JSON file keeps the 50 most recent transfers of the last 3 months
+        self.transfers = self.database.save(self.transfers, filename, days=90, limit=50)
         return self.transfers
     
     def run(self):
@@ -440,18 +316,10 @@ class RealTransferScraper:
         print("Starting real web scraping...")
         print("=" * 50)
         
-        try:
-            # Scrape multiple sources
-            self.scrape_90minut_news()
-            time.sleep(2)  # Be respectful
-            
-            self.scrape_transfermarkt_ekstraklasa()
-            time.sleep(2)
-            
-            self.scrape_ekstraklasa_org()
-            
-        except Exception as e:
-            print(f"Scraping error: {e}")
+        # Sources run concurrently; the scheduler keeps each host polite
+        pipeline = Pipeline(sources.create(self), sink=self.collect)
+        pipeline.run()
+        self.scheduler.shutdown()
         
         # Save results
         transfers = self.save_transfers()
@@ -470,6 +338,99 @@ class RealTransferScraper:
         
         return transfers
 
+class ArticleSource(Source):
+    """Source reading a listing page and then each article linked from it
+    
+    Articles already in the article store are only fetched again when their
+    headline changed, and only parsed again when their content did.
+    """
+    
+    url = None
+    
+    def list_articles(self, content):
+        raise NotImplementedError
+    
+    def extract(self, url, title, content):
+        raise NotImplementedError
+    
+    def fetch(self):
+        articles = self.scraper.articles
+        scheduler = self.scraper.scheduler
+        self.reused = 0
+        
+        listed = self.list_articles(self.scraper.fetch(self.url))
+        
+        pending = {}
+        for link, title in listed:
+            known = articles.get(link)
+            
+            # Same URL under the same headline: reuse what we extracted before
+            if known and known[0] == content_hash(title):
+                yield Page(link, None, {'title': title, 'known': known})
+                continue
+            
+            pending[scheduler.submit(link)] = (link, title, known)
+        
+        for future in as_completed(pending):
+            link, title, known = pending[future]
+            try:
+                content = future.result()
+            except Exception as e:
+                print(f"Error fetching {link}: {e}")
+                continue
+            
+            yield Page(link, content, {'title': title, 'known': known})
+        
+        print(f"{self.name}: parsed {len(listed) - self.reused} new or changed articles, "
+              f"reused {self.reused}")
+    
+    def parse(self, page):
+        title, known = page.meta['title'], page.meta['known']
+        
+        # Unchanged headline, or headline changed but the page did not
+        if page.content is None or (known and known[1] == content_hash(page.content)):
+            if page.content is not None:
+                self.scraper.articles.touch(page.url, title)
+            self.reused += 1
+            if known[2]:
+                yield dict(known[2])
+            return
+        
+        transfer = self.extract(page.url, title, page.content)
+        self.scraper.articles.put(page.url, title, page.content, transfer)
+        if transfer:
+            yield transfer
+
+@sources.register
+class NinetyMinutSource(ArticleSource):
+    name = '90minut.pl'
+    url = "https://www.90minut.pl"
+    
+    def list_articles(self, content):
+        return self.scraper.list_90minut_articles(content, self.url)
+    
+    def extract(self, url, title, content):
+        return self.scraper.extract_90minut_transfer(url, title, content)
+
+@sources.register
+class TransfermarktSource(PageSource):
+    name = 'Transfermarkt.pl'
+    urls = ["https://www.transfermarkt.pl/ekstraklasa/transfers/wettbewerb/PL1"]
+    
+    def parse(self, page):
+        return self.scraper.parse_transfermarkt(page.content, page.url)
+
+@sources.register
+class EkstraklasaOrgSource(ArticleSource):
+    name = 'Ekstraklasa.org'
+    url = "https://ekstraklasa.org/transfery/"
+    
+    def list_articles(self, content):
+        return self.scraper.list_ekstraklasa_org_articles(content, self.url)
+    
+    def extract(self, url, title, content):
+        return self.scraper.extract_ekstraklasa_org_transfer(url, title, content)
+
 if __name__ == "__main__":
     scraper = RealTransferScraper()
     transfers = scraper.run()
\ No newline at end of file
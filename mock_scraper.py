@@ -4,10 +4,11 @@ Fallback scraper for demonstration
 Creates realistic transfer data when real scraping is not available
 """
 
-import json
 from datetime import datetime, timedelta
 import random
 
+from publisher import DatasetPublisher
+
 class MockScraper:
     def __init__(self):
         self.transfers = []
@@ -115,9 +116,8 @@ class MockScraper:
         return self.transfers
     
     def save_transfers(self, filename='transfers.json'):
-        """Save transfers to JSON file"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.transfers, f, ensure_ascii=False, indent=2)
+        """Publish transfers as the JSON dataset"""
+        DatasetPublisher(filename).publish(self.transfers)
         
         print(f"Saved {len(self.transfers)} transfers to {filename}")
         return self.transfers
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Source pipeline shared by the transfer scrapers
+Runs registered sources concurrently through fetch -> parse -> normalize -> dedupe -> sink
+"""
+
+import queue
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from deduplication import FuzzyDeduplicator
+from transfer_fees import with_fee
+
+# A fetched page; content may be None when a source already has the record
+Page = namedtuple('Page', 'url content meta')
+
+DEFAULT_FIELDS = {
+    'playerName': 'Nieznany zawodnik',
+    'type': 'in',
+    'fromTeam': 'Nieznana',
+    'toTeam': 'Nieznana',
+    'transferDate': '',
+    'fee': 'Nieznana',
+    'summary': '',
+    'sourceUrl': '',
+}
+
+_DONE = object()
+
+class Source:
+    """Base class for source plugins
+
+    fetch() yields Page objects; parse(page) yields transfer dicts for a page.
+    Both are generators, so records flow downstream as soon as they exist.
+    """
+
+    name = None
+
+    def __init__(self, scraper):
+        self.scraper = scraper
+
+    def fetch(self):
+        raise NotImplementedError
+
+    def parse(self, page):
+        raise NotImplementedError
+
+class PageSource(Source):
+    """Source reading a fixed list of pages through the scraper's fetch()"""
+
+    urls = []
+
+    def fetch(self):
+        for url in self.urls:
+            yield Page(url, self.scraper.fetch(url), {})
+
+class SourceRegistry:
+    """Registry of the source plugins available to one scraper"""
+
+    def __init__(self):
+        self.sources = {}
+
+    def register(self, cls):
+        """Class decorator adding a Source subclass under its name"""
+        self.sources[cls.name] = cls
+        return cls
+
+    def create(self, scraper, names=None):
+        """Instantiate the registered sources (or just the named ones)"""
+        return [cls(scraper) for name, cls in self.sources.items()
+                if names is None or name in names]
+
+def normalize_transfer(record, source_name):
+    """Fill in missing fields, tidy whitespace and parse the fee of a raw record"""
+    transfer = dict(DEFAULT_FIELDS)
+    transfer['sourceName'] = source_name
+    for key, value in record.items():
+        if isinstance(value, str):
+            value = ' '.join(value.split())
+        if value or key not in transfer:
+            transfer[key] = value
+    return with_fee(transfer)
+
+def _timed(iterable, timings, stage):
+    """Iterate, adding the time spent producing each item to timings[stage]"""
+    iterator = iter(iterable)
+    while True:
+        started = time.perf_counter()
+        try:
+            item = next(iterator)
+        except StopIteration:
+            timings[stage] += time.perf_counter() - started
+            return
+        timings[stage] += time.perf_counter() - started
+        yield item
+
+class Pipeline:
+    """Run sources concurrently and stream their records into shared stages"""
+
+    def __init__(self, sources, sink=None, normalize=normalize_transfer,
+                 deduplicator=None, source_timeout=None):
+        self.sources = sources
+        self.sink = sink
+        self.normalize = normalize
+        self.deduplicator = deduplicator or FuzzyDeduplicator()
+        self.source_timeout = source_timeout
+
+        self.timings = defaultdict(lambda: defaultdict(float))
+        self.counts = defaultdict(int)
+        self.errors = {}
+
+    def _run_source(self, source, results):
+        timings = self.timings[source.name]
+        try:
+            for page in _timed(source.fetch(), timings, 'fetch'):
+                for record in _timed(source.parse(page), timings, 'parse'):
+                    results.put((source.name, record))
+        except Exception as e:
+            # A broken source only loses its own records
+            self.errors[source.name] = e
+            print(f"Error in source {source.name}: {e}")
+        finally:
+            results.put((source.name, _DONE))
+
+    def run(self):
+        """Run all sources and return what the sink produced"""
+        started = time.monotonic()
+        results = queue.Queue()
+
+        for source in self.sources:
+            # Daemon threads so a hung source cannot keep the process alive
+            threading.Thread(target=self._run_source, args=(source, results),
+                             name=f'source-{source.name}', daemon=True).start()
+
+        pending = {source.name for source in self.sources}
+        deadline = started + self.source_timeout if self.source_timeout else None
+        stages = self.timings['pipeline']
+
+        while pending:
+            wait = None if deadline is None else max(0, deadline - time.monotonic())
+            try:
+                name, record = results.get(timeout=wait)
+            except queue.Empty:
+                print(f"Gave up waiting for: {', '.join(sorted(pending))}")
+                for name in pending:
+                    self.errors[name] = TimeoutError('source timed out')
+                break
+
+            if record is _DONE:
+                pending.discard(name)
+                continue
+
+            self.counts[name] += 1
+
+            step = time.perf_counter()
+            transfer = self.normalize(record, name)
+            stages['normalize'] += time.perf_counter() - step
+
+            step = time.perf_counter()
+            self.deduplicator.add(transfer)
+            stages['dedupe'] += time.perf_counter() - step
+
+        transfers = self.deduplicator.records
+        if self.sink:
+            step = time.perf_counter()
+            transfers = self.sink(transfers)
+            stages['sink'] += time.perf_counter() - step
+
+        stages['total'] = time.monotonic() - started
+        self.report()
+        return transfers
+
+    def report(self):
+        """Print per-source and per-stage timings"""
+        print("Pipeline timings:")
+        for source in self.sources:
+            timings = self.timings[source.name]
+            status = ' (failed)' if source.name in self.errors else ''
+            print(f"  {source.name:<20} fetch {timings['fetch']:6.2f}s  "
+                  f"parse {timings['parse']:6.2f}s  "
+                  f"records {self.counts[source.name]}{status}")
+
+        stages = self.timings['pipeline']
+        print(f"  normalize {stages['normalize']:.2f}s, dedupe {stages['dedupe']:.2f}s, "
+              f"sink {stages['sink']:.2f}s, total {stages['total']:.2f}s")
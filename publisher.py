@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Atomic, versioned publishing of the transfer dataset
+Files are replaced whole, and manifest.json records the version and hash of every generation
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+DEFAULT_DATA_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transfers.json')
+MANIFEST_NAME = 'manifest.json'
+
+def content_hash(data):
+    return 'sha256:' + hashlib.sha256(data).hexdigest()
+
+class AtomicFile:
+    """File written in pieces and moved into place only on commit()
+
+    The bytes go to a temporary file in the same directory, which commit()
+    fsyncs and renames over path; the directory is fsynced too, so the
+    rename survives a crash. Readers see either the old file or the new one.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.directory = os.path.dirname(os.path.abspath(path))
+        fd, self.tmp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.',
+                                             suffix='.tmp', dir=self.directory)
+        self.file = os.fdopen(fd, 'wb')
+
+    def write(self, data):
+        self.file.write(data)
+
+    def commit(self):
+        try:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.file.close()
+            # mkstemp creates the file private; published files are meant to be read
+            os.chmod(self.tmp_path, 0o644)
+            os.replace(self.tmp_path, self.path)
+        except BaseException:
+            self.discard()
+            raise
+        fsync_directory(self.directory)
+
+    def discard(self):
+        self.file.close()
+        try:
+            os.unlink(self.tmp_path)
+        except OSError:
+            pass
+
+def fsync_directory(directory):
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return  # Directories cannot be opened on Windows
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+def atomic_write(path, data):
+    """Replace path with data so readers see either the old file or the new one"""
+    f = AtomicFile(path)
+    try:
+        f.write(data)
+    except BaseException:
+        f.discard()
+        raise
+    f.commit()
+
+def read_manifest(path):
+    """Load a manifest, or None if there is none (yet)"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return manifest if isinstance(manifest, dict) else None
+
+def serialize_transfers(transfers):
+    return json.dumps(transfers, ensure_ascii=False, indent=2).encode('utf-8')
+
+class DatasetPublisher:
+    """Write dataset generations next to a manifest
+
+    The data file is written first and the manifest last, so a manifest
+    never points at data that is not fully on disk. Publishing content
+    identical to the current generation changes nothing.
+    """
+
+    def __init__(self, data_file=DEFAULT_DATA_FILE, manifest_file=None):
+        self.data_file = data_file
+        self.manifest_file = manifest_file or os.path.join(
+            os.path.dirname(os.path.abspath(data_file)), MANIFEST_NAME)
+
+    def manifest(self):
+        return read_manifest(self.manifest_file)
+
+    def publish(self, transfers):
+        """Publish transfers as the next generation; returns the manifest in effect"""
+        data = serialize_transfers(transfers)
+        digest = content_hash(data)
+
+        current = self.manifest() or {}
+        if current.get('hash') == digest and os.path.exists(self.data_file):
+            print(f"Dataset unchanged, still version {current.get('version')}")
+            return current
+
+        manifest = {
+            'version': current.get('version', 0) + 1,
+            'hash': digest,
+            'count': len(transfers),
+            'published': datetime.now().isoformat(timespec='seconds'),
+            'files': {self._name(self.data_file): digest},
+        }
+        atomic_write(self.data_file, data)
+        self._write_manifest(manifest)
+        print(f"Published dataset version {manifest['version']} ({len(transfers)} transfers)")
+        return manifest
+
+    def publish_file(self, path, data):
+        """Publish a file derived from the current generation; returns False if unchanged"""
+        digest = content_hash(data)
+        if self.unchanged(path, digest):
+            return False
+        atomic_write(path, data)
+        self.record_files({path: digest})
+        return True
+
+    def unchanged(self, path, digest):
+        """Check the manifest already records digest for path, and path exists"""
+        files = (self.manifest() or {}).get('files', {})
+        return files.get(self._name(path)) == digest and os.path.exists(path)
+
+    def record_files(self, digests):
+        """Record the hashes of freshly published derived files in the manifest"""
+        manifest = self.manifest() or {}
+        files = manifest.setdefault('files', {})
+        for path, digest in digests.items():
+            files[self._name(path)] = digest
+        self._write_manifest(manifest)
+
+    def _name(self, path):
+        return os.path.relpath(os.path.abspath(path), os.path.dirname(self.manifest_file))
+
+    def _write_manifest(self, manifest):
+        data = json.dumps(manifest, ensure_ascii=False, indent=2).encode('utf-8') + b'\n'
+        atomic_write(self.manifest_file, data)
@@ -5,23 +5,128 @@ Scrapes actual transfer data from Polish football websites
 Works with GitHub Actions for automatic updates
 """
 
+import codecs
 import json
 import re
 import time
-from datetime import datetime, timedelta
 from urllib.parse import urljoin
 
 # We'll use built-in libraries for GitHub Actions compatibility
-import urllib.request
-import urllib.error
 from html.parser import HTMLParser
 
-class TransferScraper:
+from date_parsing import DateNormalizer
+from deduplication import deduplicate
+from http_cache import HTTPCache
+from pipeline import Page, PageSource, Pipeline, Source, SourceRegistry
+from publisher import atomic_write
+from team_matching import matcher as team_matcher
+from transfer_classification import classify_transfer
+from transfer_db import TransferDatabase
+
+class TransfermarktRowParser(HTMLParser):
+    """Event-driven extractor for Transfermarkt transfer table rows
+    
+    Collects player, clubs, fee and date from each tr.transfer-row in one
+    pass. Finished rows are queued in self.rows as they close, so callers can
+    drain them while feeding the page in chunks.
+    """
+    
     def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.rows = []
+        self.row = None
+        self.tr_depth = 0
+        self.cells = []  # field name (or None) for each open td in the row
+        self.in_player = False
+    
+    def handle_starttag(self, tag, attrs):
+        classes = (dict(attrs).get('class') or '').split()
+        
+        if tag == 'tr':
+            if self.row is not None:
+                self.tr_depth += 1
+            elif 'transfer-row' in classes:
+                self.row = {}
+                self.tr_depth = 1
+                self.cells = []
+            return
+        
+        if self.row is None:
+            return
+        
+        if tag == 'td':
+            field = None
+            if 'verein' in classes:
+                field = 'to_team' if 'from_team' in self.row else 'from_team'
+            elif 'Ablöse' in classes:
+                field = 'fee'
+            elif 'datum' in classes:
+                field = 'date'
+            if field:
+                self.row[field] = ''
+            self.cells.append(field)
+        elif tag == 'a' and 'spielname' in classes and 'player' not in self.row:
+            self.in_player = True
+            self.row['player'] = ''
+    
+    def handle_endtag(self, tag):
+        if self.row is None:
+            return
+        
+        if tag == 'a' and self.in_player:
+            self.in_player = False
+        elif tag == 'td' and self.cells:
+            self.cells.pop()
+        elif tag == 'tr':
+            self.tr_depth -= 1
+            if self.tr_depth == 0:
+                self.rows.append({key: ' '.join(value.split()) for key, value in self.row.items()})
+                self.row = None
+                self.in_player = False
+    
+    def handle_data(self, data):
+        if self.row is None:
+            return
+        
+        if self.in_player:
+            self.row['player'] += data
+        for field in self.cells:
+            if field:
+                self.row[field] += data
+
+def iter_transfermarkt_rows(chunks, encoding='utf-8'):
+    """Yield Transfermarkt transfer rows while the page is still arriving
+    
+    chunks are the bytes of the response as they are read (or page text);
+    each row is yielded as soon as its closing tag has been fed.
+    """
+    parser = TransfermarktRowParser()
+    # A multi-byte character may be split across chunks
+    decoder = codecs.getincrementaldecoder(encoding)(errors='ignore')
+    if isinstance(chunks, (str, bytes)):
+        chunks = [chunks]
+    
+    for chunk in chunks:
+        parser.feed(decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+        rows, parser.rows = parser.rows, []
+        yield from rows
+    
+    parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+    yield from parser.rows
+
+# Source plugins run by TransferScraper.run()
+sources = SourceRegistry()
+
+class TransferScraper:
+    def __init__(self, cache=None, database=None):
         self.transfers = []
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
+        self.cache = cache or HTTPCache()
+        self.database = database or TransferDatabase()
+        self.dates = DateNormalizer()
         
         # Ekstraklasa teams for filtering
         self.ekstraklasa_teams = {
@@ -36,27 +141,40 @@ class TransferScraper:
         """Fetch webpage with retries"""
         for attempt in range(retries):
             try:
-                req = urllib.request.Request(url, headers=self.headers)
-                with urllib.request.urlopen(req, timeout=10) as response:
-                    return response.read().decode('utf-8', errors='ignore')
+                body = self.cache.urlopen(url, headers=self.headers, timeout=10)
+                return body.decode('utf-8', errors='ignore')
             except Exception as e:
                 print(f"Attempt {attempt + 1} failed for {url}: {e}")
                 if attempt < retries - 1:
                     time.sleep(2)
         return None
     
-    def parse_90minut_transfers(self):
-        """Scrape 90minut.pl transfer news"""
-        print("Scraping 90minut.pl...")
-        
-        # Main 90minut page
-        main_url = "https://www.90minut.pl"
-        html = self.fetch_page(main_url)
-        
+    def stream_page(self, url, retries=3):
+        """Yield a page's bytes as they download; only failures before the first chunk are retried"""
+        for attempt in range(retries):
+            started = False
+            try:
+                for chunk in self.cache.stream(url, headers=self.headers, timeout=10):
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                print(f"Attempt {attempt + 1} failed for {url}: {e}")
+                if started:
+                    return
+                if attempt < retries - 1:
+                    time.sleep(2)
+        print(f"Failed to fetch {url}")
+    
+    def fetch(self, url):
+        """Fetch a page for the pipeline, or None if it could not be fetched"""
+        html = self.fetch_page(url)
         if not html:
-            print("Failed to fetch 90minut.pl")
-            return
-        
+            print(f"Failed to fetch {url}")
+        return html
+    
+    def parse_90minut_transfers(self, html, main_url):
+        """Parse transfer headlines from the 90minut.pl front page"""
         # Look for transfer news in the main page
         # 90minut uses specific patterns for transfer news
         transfer_keywords = ['transfer', 'przenosi się', 'dołącza', 'odejdzie', 'wypożyczony']
@@ -77,121 +195,67 @@ class TransferScraper:
                 # Get more details
                 details = self.extract_transfer_details(title)
                 
-                transfer = {
-                    'id': len(self.transfers) + 1,
+                yield {
                     'playerName': player_name,
                     'type': transfer_type,
                     'fromTeam': details.get('from_team', 'Nieznana'),
                     'toTeam': details.get('to_team', 'Nieznana'),
-                    'transferDate': datetime.now().strftime('%Y-%m-%d'),
+                    'transferDate': self.dates.today,
                     'fee': details.get('fee', 'Nieznana'),
                     'summary': title.strip(),
                     'sourceUrl': full_url,
                     'sourceName': '90minut.pl'
                 }
-                
-                self.transfers.append(transfer)
     
-    def parse_transfermarkt_ekstraklasa(self):
-        """Scrape Ekstraklasa transfers from Transfermarkt"""
-        print("Scraping Transfermarkt...")
+    def parse_transfermarkt_ekstraklasa(self, content, url):
+        """Parse Ekstraklasa transfers from the Transfermarkt table
         
-        url = "https://www.transfermarkt.pl/ekstraklasa/transfers/wettbewerb/PL1"
-        html = self.fetch_page(url)
-        
-        if not html:
-            print("Failed to fetch Transfermarkt")
-            return
-        
-        # Look for recent transfers
-        # Transfermarkt has specific table structure
-        rows = re.findall(r'<tr[^>]*class="[^"]*transfer-row[^"]*"[^>]*>.*?</tr>', html, re.DOTALL)
-        
-        for row in rows:
+        content is the page text or its chunks as they download; rows are
+        parsed in a single pass while the rest of the page is still arriving.
+        """
+        for row in iter_transfermarkt_rows(content):
             try:
-                # Extract player name
-                player_match = re.search(r'<a[^>]*class="[^"]*spielname[^"]*"[^>]*>([^<]+)</a>', row)
-                if not player_match:
+                player_name = row.get('player')
+                if not player_name:
                     continue
                 
-                player_name = player_match.group(1).strip()
-                
-                # Extract teams
-                from_team_match = re.search(r'<td[^>]*class="[^"]*verein[^"]*"[^>]*>([^<]+)</td>', row)
-                to_team_match = re.search(r'<td[^>]*class="[^"]*verein[^"]*"[^>]*>([^<]+)</td>', row)
-                
-                # Extract fee
-                fee_match = re.search(r'<td[^>]*class="[^"]*Ablöse[^"]*"[^>]*>([^<]+)</td>', row)
-                fee = fee_match.group(1).strip() if fee_match else 'Nieznana'
-                
-                # Extract date
-                date_match = re.search(r'<td[^>]*class="[^"]*datum[^"]*"[^>]*>([^<]+)</td>', row)
-                date_str = date_match.group(1).strip() if date_match else ''
-                
-                transfer = {
-                    'id': len(self.transfers) + 1,
+                yield {
                     'playerName': player_name,
                     'type': 'in',  # Default to incoming for now
-                    'fromTeam': from_team_match.group(1).strip() if from_team_match else 'Nieznana',
-                    'toTeam': to_team_match.group(1).strip() if to_team_match else 'Nieznana',
-                    'transferDate': self.parse_date(date_str),
-                    'fee': fee,
+                    'fromTeam': row.get('from_team') or 'Nieznana',
+                    'toTeam': row.get('to_team') or 'Nieznana',
+                    'transferDate': self.parse_date(row.get('date', '')),
+                    'fee': row.get('fee') or 'Nieznana',
                     'summary': f'{player_name} transfer between clubs',
                     'sourceUrl': url,
                     'sourceName': 'Transfermarkt.pl'
                 }
                 
-                self.transfers.append(transfer)
-                
             except Exception as e:
                 print(f"Error parsing transfer row: {e}")
                 continue
     
-    def get_recent_club_transfers(self):
-        """Get transfers from official Ekstraklasa club websites"""
-        print("Scraping club websites...")
-        
-        # Club websites that have transfer news
-        club_websites = [
-            ('Legia Warszawa', 'https://legia.com'),
-            ('Lech Poznań', 'https://www.lechpoznan.pl'),
-            ('Wisła Kraków', 'https://www.wisla.krakow.pl'),
-            ('Raków Częstochowa', 'https://www.rakow.com.pl'),
-            ('Śląsk Wrocław', 'https://slaskwroclaw.com'),
-        ]
-        
-        for club_name, club_url in club_websites:
-            try:
-                html = self.fetch_page(club_url)
-                if not html:
-                    continue
-                
-                # Look for transfer news
-                transfer_links = re.findall(r'<a[^>]*href="([^"]*)"[^>]*>([^<]*transfer[^<]*)</a>', html, re.IGNORECASE)
-                
-                for link, title in transfer_links:
-                    full_url = urljoin(club_url, link)
-                    player_name = self.extract_player_name(title)
-                    transfer_type = self.determine_transfer_type(title)
-                    
-                    transfer = {
-                        'id': len(self.transfers) + 1,
-                        'playerName': player_name,
-                        'type': transfer_type,
-                        'fromTeam': club_name if transfer_type == 'out' else 'Nieznana',
-                        'toTeam': club_name if transfer_type == 'in' else 'Nieznana',
-                        'transferDate': datetime.now().strftime('%Y-%m-%d'),
-                        'fee': 'Nieznana',
-                        'summary': title.strip(),
-                        'sourceUrl': full_url,
-                        'sourceName': f'{club_name} - Oficjalna strona'
-                    }
-                    
-                    self.transfers.append(transfer)
-                    
-            except Exception as e:
-                print(f"Error scraping {club_name}: {e}")
-                continue
+    def parse_club_transfers(self, html, club_url, club_name):
+        """Parse transfer news links from an official club website"""
+        # Look for transfer news
+        transfer_links = re.findall(r'<a[^>]*href="([^"]*)"[^>]*>([^<]*transfer[^<]*)</a>', html, re.IGNORECASE)
+        
+        for link, title in transfer_links:
+            full_url = urljoin(club_url, link)
+            player_name = self.extract_player_name(title)
+            transfer_type = self.determine_transfer_type(title)
+            
+            yield {
+                'playerName': player_name,
+                'type': transfer_type,
+                'fromTeam': club_name if transfer_type == 'out' else 'Nieznana',
+                'toTeam': club_name if transfer_type == 'in' else 'Nieznana',
+                'transferDate': self.dates.today,
+                'fee': 'Nieznana',
+                'summary': title.strip(),
+                'sourceUrl': full_url,
+                'sourceName': f'{club_name} - Oficjalna strona'
+            }
     
     def extract_player_name(self, text):
         """Extract player name from text"""
@@ -214,105 +278,48 @@ class TransferScraper:
     
     def determine_transfer_type(self, text):
         """Determine if it's incoming or outgoing transfer"""
-        text_lower = text.lower()
-        
-        outgoing_keywords = ['opuszcza', 'odchodzi', 'sprzedany', 'wypożyczony', 'żegna się', 'transfer do']
-        incoming_keywords = ['dołącza', 'podpisuje', 'przychodzi', 'zatrudnia', 'transfer z', 'nowym zawodnikiem']
-        
-        for keyword in outgoing_keywords:
-            if keyword in text_lower:
-                return 'out'
-        
-        for keyword in incoming_keywords:
-            if keyword in text_lower:
-                return 'in'
-        
-        # Default based on context
-        return 'in'
+        return classify_transfer(text).type
     
     def extract_transfer_details(self, title):
         """Extract transfer details from title"""
         details = {}
         
         # Look for team names
-        teams_found = []
-        for team in self.ekstraklasa_teams:
-            if team.lower() in title.lower():
-                teams_found.append(team)
+        teams = team_matcher.classify(title)
+        first_team = team_matcher.first(title)
         
-        if len(teams_found) >= 1:
-            details['to_team'] = teams_found[0]  # Assume first found is destination
+        if teams['from']:
+            details['from_team'] = teams['from']
         
-        # Look for fee information
-        fee_patterns = [
-            r'(\d+\.?\d*)\s*m\s*€',  # X.XM €
-            r'(\d+)\s*tys',  # X tys
-            r'bezpłatnie',  # free
-            r'wolny',  # free agent
-        ]
+        # Without context, assume the first club mentioned is the destination
+        to_team = teams['to'] or (first_team if first_team != teams['from'] else None)
+        if to_team:
+            details['to_team'] = to_team
         
-        for pattern in fee_patterns:
-            match = re.search(pattern, title, re.IGNORECASE)
-            if match:
-                if 'bezpłatnie' in pattern or 'wolny' in pattern:
-                    details['fee'] = 'Bez opłaty'
-                else:
-                    details['fee'] = match.group(0)
-                break
+        # Look for fee information
+        fee = classify_transfer(title, default_fee=None).fee
+        if fee:
+            details['fee'] = fee
         
         return details
     
     def parse_date(self, date_str):
         """Parse various date formats"""
-        try:
-            # Common Polish date formats
-            formats = [
-                '%d.%m.%Y', '%d.%m.%y',
-                '%d/%m/%Y', '%d/%m/%y',
-                '%d-%m-%Y', '%d-%m-%y'
-            ]
-            
-            for fmt in formats:
-                try:
-                    return datetime.strptime(date_str.strip(), fmt).strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
-                    
-        except Exception:
-            pass
-            
-        return datetime.now().strftime('%Y-%m-%d')
+        return self.dates.normalize(date_str)
     
     def deduplicate_transfers(self):
         """Remove duplicate transfers"""
-        seen = set()
-        unique_transfers = []
-        
-        for transfer in self.transfers:
-            # Create unique key based on player name and teams
-            key = f"{transfer['playerName'].lower()}-{transfer['fromTeam']}-{transfer['toTeam']}"
-            
-            if key not in seen:
-                seen.add(key)
-                unique_transfers.append(transfer)
-        
-        return unique_transfers
+        return deduplicate(self.transfers)
+    
+    def collect(self, transfers):
+        """Pipeline sink: keep the scraped transfers"""
+        self.transfers = transfers
+        return transfers
     
     def save_transfers(self, filename='transfers.json'):
-        """Save transfers to JSON file"""
-        # Remove duplicates
-        self.transfers = self.deduplicate_transfers()
-        
-        # Sort by date
-        self.transfers.sort(key=lambda x: x.get('transferDate', ''), reverse=True)
-        
-        # Limit to most recent 50 transfers
-        self.transfers = self.transfers[:50]
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.transfers, f, ensure_ascii=False, indent=2)
-        
-        print(f"Saved {len(self.transfers)} transfers to {filename}")
+        """Store transfers in the database and export recent ones to JSON"""
+        # The JSON file keeps the 50 most recent transfers
+        self.transfers = self.database.save(self.transfers, filename, limit=50)
         return self.transfers
     
     def generate_html_data(self):
@@ -330,23 +337,69 @@ class TransferScraper:
         """Run the scraper"""
         print("Starting Ekstraklasa transfer scraping...")
         
-        try:
-            # Scrape different sources
-            self.parse_90minut_transfers()
-            time.sleep(1)  # Be respectful to servers
-            
-            self.parse_transfermarkt_ekstraklasa()
-            time.sleep(1)
-            
-            self.get_recent_club_transfers()
-            
-        except Exception as e:
-            print(f"Scraping error: {e}")
+        # Each source hits a different host, so they run concurrently
+        pipeline = Pipeline(sources.create(self), sink=self.collect)
+        pipeline.run()
         
         # Save results
         transfers = self.save_transfers()
         return transfers
 
+class HTMLPageSource(PageSource):
+    """Page source skipping pages that could not be fetched"""
+    
+    def fetch(self):
+        for page in super().fetch():
+            if page.content:
+                yield page
+
+@sources.register
+class NinetyMinutSource(HTMLPageSource):
+    name = '90minut.pl'
+    urls = ["https://www.90minut.pl"]
+    
+    def parse(self, page):
+        return self.scraper.parse_90minut_transfers(page.content, page.url)
+
+@sources.register
+class TransfermarktSource(PageSource):
+    name = 'Transfermarkt.pl'
+    urls = ["https://www.transfermarkt.pl/ekstraklasa/transfers/wettbewerb/PL1"]
+    
+    def fetch(self):
+        # The body is handed over unread, so parsing overlaps the download
+        for url in self.urls:
+            yield Page(url, self.scraper.stream_page(url), {})
+    
+    def parse(self, page):
+        return self.scraper.parse_transfermarkt_ekstraklasa(page.content, page.url)
+
+@sources.register
+class ClubWebsitesSource(Source):
+    name = 'Club websites'
+    
+    # Club websites that have transfer news
+    club_websites = [
+        ('Legia Warszawa', 'https://legia.com'),
+        ('Lech Poznań', 'https://www.lechpoznan.pl'),
+        ('Wisła Kraków', 'https://www.wisla.krakow.pl'),
+        ('Raków Częstochowa', 'https://www.rakow.com.pl'),
+        ('Śląsk Wrocław', 'https://slaskwroclaw.com'),
+    ]
+    
+    def fetch(self):
+        for club_name, club_url in self.club_websites:
+            html = self.scraper.fetch(club_url)
+            if html:
+                yield Page(club_url, html, {'club': club_name})
+    
+    def parse(self, page):
+        club_name = page.meta['club']
+        try:
+            yield from self.scraper.parse_club_transfers(page.content, page.url, club_name)
+        except Exception as e:
+            print(f"Error scraping {club_name}: {e}")
+
 if __name__ == "__main__":
     scraper = TransferScraper()
     transfers = scraper.run()
@@ -355,7 +408,6 @@ if __name__ == "__main__":
     
     # Generate HTML update
     js_data = scraper.generate_html_data()
-    with open('transfer_data.js', 'w', encoding='utf-8') as f:
-        f.write(js_data)
+    atomic_write('transfer_data.js', js_data.encode('utf-8'))
     
     print("Generated transfer_data.js for HTML embedding")
\ No newline at end of file
@@ -4,9 +4,10 @@ Realistic Transfer Data Generator
 Uses actual current transfer information with correct teams and working links
 """
 
-import json
 from datetime import datetime, timedelta
 
+from publisher import DatasetPublisher
+
 class RealTransferGenerator:
     def __init__(self):
         self.transfers = []
@@ -266,8 +267,7 @@ class RealTransferGenerator:
         # Sort by date
         transfers.sort(key=lambda x: x['transferDate'], reverse=True)
         
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(transfers, f, ensure_ascii=False, indent=2)
+        DatasetPublisher(filename).publish(transfers)
         
         print(f"Saved {len(transfers)} real transfers to {filename}")
         return transfers
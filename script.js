@@ -1,28 +1,74 @@
+// Needs transfer-list.js loaded first
 class EkstraklasaTransfers {
     constructor() {
-        this.transfers = [];
+        this.data = new TransferData();
         this.teams = [];
         this.filters = {
             team: '',
             type: ''
         };
+        this.search = '';
+        this.sort = 'newest';
+        this.version = null;
+        this.view = null;
         this.init();
     }
 
     async init() {
         await this.loadTransfers();
+        this.view = new TransferView(
+            document.getElementById('transfers-container'),
+            this.data,
+            transfer => this.createTransferHTML(transfer),
+            { empty: '<div class="no-results">Brak transferów spełniających kryteria filtrowania</div>' }
+        );
         this.setupFilters();
         this.renderTransfers();
+        this.subscribe();
+    }
+
+    subscribe() {
+        // Live updates pushed by the API server; the browser reconnects and resumes by itself
+        if (!window.EventSource) {
+            return;
+        }
+        const events = new EventSource('/api/stream');
+        let reconnected = false;
+
+        events.addEventListener('open', () => {
+            reconnected = this.version !== null;
+        });
+
+        events.addEventListener('transfer', async (e) => {
+            reconnected = false;
+            await this.data.request('add', { transfers: [JSON.parse(e.data)], prepend: true });
+            this.renderTransfers();
+        });
+
+        events.addEventListener('version', async (e) => {
+            const version = JSON.stringify(JSON.parse(e.data).version);
+            // Missed more than the server remembers: reload everything
+            if (reconnected && version !== this.version) {
+                await this.loadTransfers();
+                this.renderTransfers();
+            }
+            reconnected = false;
+            this.version = version;
+        });
     }
 
     async loadTransfers() {
         try {
-            // Load data from API
-            const response = await fetch('/api/transfers');
-            if (!response.ok) {
-                throw new Error('Failed to fetch transfers');
+            // The worker loads the data from the API, following pagination cursors
+            const loaded = await this.data.request('load', {
+                url: new URL('/api/transfers?limit=1000', location.href).href,
+                paginate: true,
+                replace: true
+            });
+            if (this.view) {
+                this.view.forget();
             }
-            this.transfers = await response.json();
+            this.dataTeams = loaded.teams;
             await this.loadTeams();
         } catch (error) {
             console.error('Error loading transfers:', error);
@@ -86,21 +132,15 @@ class EkstraklasaTransfers {
     }
 
     extractTeams() {
-        const teamSet = new Set();
-        this.transfers.forEach(transfer => {
-            if (transfer.fromTeam && transfer.fromTeam !== "Wolny agent") {
-                teamSet.add(transfer.fromTeam);
-            }
-            if (transfer.toTeam && transfer.toTeam !== "Wolny agent") {
-                teamSet.add(transfer.toTeam);
-            }
-        });
-        this.teams = Array.from(teamSet).sort();
+        // Collected by the worker while loading
+        this.teams = this.dataTeams || [];
     }
 
     setupFilters() {
         const teamFilter = document.getElementById('team-filter');
         const typeFilter = document.getElementById('transfer-type');
+        const searchInput = document.getElementById('transfer-search');
+        const sortSelect = document.getElementById('transfer-sort');
 
         // Populate team filter
         this.teams.forEach(team => {
@@ -120,31 +160,21 @@ class EkstraklasaTransfers {
             this.filters.type = e.target.value;
             this.renderTransfers();
         });
-    }
 
-    getFilteredTransfers() {
-        return this.transfers.filter(transfer => {
-            const teamMatch = !this.filters.team || 
-                transfer.fromTeam === this.filters.team || 
-                transfer.toTeam === this.filters.team;
-            
-            const typeMatch = !this.filters.type || 
-                transfer.type === this.filters.type;
-            
-            return teamMatch && typeMatch;
+        searchInput.addEventListener('input', (e) => {
+            this.search = e.target.value;
+            this.renderTransfers();
+        });
+
+        sortSelect.addEventListener('change', (e) => {
+            this.sort = e.target.value;
+            this.renderTransfers();
         });
     }
 
     renderTransfers() {
-        const container = document.getElementById('transfers-container');
-        const filteredTransfers = this.getFilteredTransfers();
-
-        if (filteredTransfers.length === 0) {
-            container.innerHTML = '<div class="no-results">Brak transferów spełniających kryteria filtrowania</div>';
-            return;
-        }
-
-        container.innerHTML = filteredTransfers.map(transfer => this.createTransferHTML(transfer)).join('');
+        // Filtering, search and sorting run in transfer-worker.js; only ids come back
+        return this.view.show({ filters: this.filters, search: this.search, sort: this.sort });
     }
 
     createTransferHTML(transfer) {
@@ -170,7 +200,7 @@ class EkstraklasaTransfers {
                     </div>
                     <div class="detail-item">
                         <span class="detail-label">Data:</span>
-                        <span class="detail-value">${this.formatDate(transfer.transferDate)}</span>
+                        <span class="detail-value">${transfer.transferDateText}</span>
                     </div>
                     <div class="detail-item">
                         <span class="detail-label">Opłata:</span>
@@ -191,15 +221,6 @@ class EkstraklasaTransfers {
         `;
     }
 
-    formatDate(dateString) {
-        const date = new Date(dateString);
-        return date.toLocaleDateString('pl-PL', {
-            day: '2-digit',
-            month: '2-digit',
-            year: 'numeric'
-        });
-    }
-
     showError(message) {
         const container = document.getElementById('transfers-container');
         container.innerHTML = `<div class="error">${message}</div>`;
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Team name matching shared by the transfer scrapers
+Finds Ekstraklasa clubs in Polish text, including inflected forms, in one pass
+"""
+
+import re
+from collections import namedtuple
+
+# Canonical name -> pattern for the club and its common inflected forms.
+# Clubs whose short name is an ordinary Polish word require the city.
+TEAM_PATTERNS = [
+    ('Legia Warszawa', r'legi[aięą](?:\s+warszawa)?'),
+    ('Lech Poznań', r'lech(?:a|owi|em|u)?(?:\s+poznań)?'),
+    ('Wisła Kraków', r'wisł(?:a|y|ę|ą|e)\s+krak(?:ów|owa|owie)'),
+    ('Wisła Płock', r'wisł(?:a|y|ę|ą|e)\s+płock'),
+    ('Lechia Gdańsk', r'lechi[aięą](?:\s+gdańsk)?'),
+    ('Jagiellonia Białystok', r'jagielloni[aięą](?:\s+białystok)?'),
+    ('Cracovia', r'cracovi[aięą]'),
+    ('Śląsk Wrocław', r'śląsk(?:a|iem|owi|u)?(?:\s+wrocław)?'),
+    ('Pogoń Szczecin', r'pogo(?:ń|ni|nią)(?:\s+szczecin)?'),
+    ('Górnik Zabrze', r'górnik(?:a|iem|owi|u)?(?:\s+zabrze)?'),
+    ('Raków Częstochowa', r'rak(?:ów|owa|owem|owie|owowi)(?:\s+częstochowa)?'),
+    ('Bruk-Bet Termalica Nieciecza', r'(?:bruk-bet\s+)?termali(?:ca|ki|kę|ką|ce)(?:\s+nieciecza)?'),
+    ('Stal Mielec', r'stal(?:i|ą)?\s+mielec'),
+    ('Warta Poznań', r'wart(?:a|y|ę|ą|cie)\s+poznań'),
+    ('Radomiak Radom', r'radomia(?:k|ka|kiem|kowi|ku)(?:\s+radom)?'),
+    ('Korona Kielce', r'koron(?:a|y|ę|ą|ie)\s+kielce'),
+    ('ŁKS Łódź', r'łks(?:\s+łódź)?'),
+    ('Zagłębie Lubin', r'zagłębi(?:e|a|em|u)(?:\s+lubin)?'),
+    ('GKS Katowice', r'gks\s+katowice'),
+]
+
+# Context words marking a club as the destination or the origin of a transfer
+TO_BEFORE = {'do'}
+FROM_BEFORE = {'z', 'ze', 'opuszcza', 'opuścił', 'opuściła', 'opuściło'}
+TO_AFTER = {'dołącza', 'pozyskuje', 'zatrudnia'}
+FROM_AFTER = {'opuszcza', 'sprzedaje', 'sprzedany', 'żegna'}
+
+TeamMention = namedtuple('TeamMention', 'team start end before after')
+
+_WORD_BEFORE = re.compile(r'(\w+)\W*$')
+_WORD_AFTER = re.compile(r'\W*(\w+)')
+
+class TeamMatcher:
+    """Precompiled matcher finding every club mention with its context words"""
+
+    def __init__(self, patterns=TEAM_PATTERNS):
+        self.teams = {}
+        alternatives = []
+        for index, (team, pattern) in enumerate(patterns):
+            group = f't{index}'
+            self.teams[group] = team
+            alternatives.append(f'(?P<{group}>{pattern})')
+
+        # Whole words only, so "Lech" never matches inside "Lechia"
+        self.regex = re.compile(
+            r'(?<!\w)(?:' + '|'.join(alternatives) + r')(?!\w)', re.IGNORECASE)
+
+    def find(self, text):
+        """Find all team mentions in text, in order of appearance"""
+        mentions = []
+        for match in self.regex.finditer(text):
+            # Context words are read around the match, not consumed by it
+            before = _WORD_BEFORE.search(text, max(0, match.start() - 30), match.start())
+            after = _WORD_AFTER.match(text, match.end(), match.end() + 30)
+            mentions.append(TeamMention(
+                self.teams[match.lastgroup],
+                match.start(),
+                match.end(),
+                before.group(1).lower() if before else None,
+                after.group(1).lower() if after else None,
+            ))
+        return mentions
+
+    def first(self, text):
+        """Get the first team mentioned in text, or None"""
+        match = self.regex.search(text)
+        return self.teams[match.lastgroup] if match else None
+
+    def classify(self, text):
+        """Work out origin and destination clubs from context words"""
+        teams = {'from': None, 'to': None}
+
+        for mention in self.find(text):
+            if mention.before in TO_BEFORE or mention.after in TO_AFTER:
+                teams['to'] = teams['to'] or mention.team
+            elif mention.before in FROM_BEFORE or mention.after in FROM_AFTER:
+                teams['from'] = teams['from'] or mention.team
+
+        return teams
+
+matcher = TeamMatcher()
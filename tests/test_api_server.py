@@ -0,0 +1,25 @@
+import unittest
+
+from api_server import CachedResponse, choose_encoding
+
+class EncodingNegotiationTest(unittest.TestCase):
+    def test_refused_coding_stays_refused_under_wildcard(self):
+        self.assertEqual(choose_encoding('gzip;q=0, *', ('gzip',)), 'identity')
+        self.assertEqual(choose_encoding('gzip;q=0, *', ('gzip', 'br')), 'br')
+
+    def test_highest_q_wins(self):
+        self.assertEqual(choose_encoding('br;q=0.1, gzip;q=1', ('gzip', 'br')), 'gzip')
+        self.assertEqual(choose_encoding('gzip;q=0.5, br', ('gzip', 'br')), 'br')
+
+    def test_only_exact_coding_names_count(self):
+        self.assertEqual(choose_encoding('x-gzip-foo', ('gzip',)), 'identity')
+        self.assertEqual(choose_encoding('GZIP; Q=0.5', ('gzip',)), 'gzip')
+        self.assertEqual(choose_encoding(None, ('gzip',)), 'identity')
+
+    def test_cached_response_uses_same_negotiation(self):
+        response = CachedResponse({'transfers': []})
+        self.assertEqual(response.choose('gzip;q=0, br;q=0, *'), 'identity')
+        self.assertEqual(response.choose('br;q=0, gzip;q=1'), 'gzip')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,21 @@
+import unittest
+from unittest import mock
+
+import html_parsing
+from html_parsing import parse_article
+
+class ParseArticleTest(unittest.TestCase):
+    def test_text_comes_from_the_container(self):
+        page = b'<html><body><nav>Menu</nav><article>Lech pozyskuje napastnika</article></body></html>'
+        soup, text = parse_article(page)
+        self.assertEqual(text, 'Lech pozyskuje napastnika')
+
+    def test_page_without_container_is_parsed_once(self):
+        page = '<html><body><table><tr><td>Raków sprzedaje obrońcę</td></tr></table></body></html>'
+        with mock.patch.object(html_parsing, 'parse_html', wraps=html_parsing.parse_html) as parse:
+            soup, text = parse_article(page)
+        self.assertEqual(text, 'Raków sprzedaje obrońcę')
+        self.assertEqual(parse.call_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+
+from transfer_classification import classify_transfer, extract_fee
+
+class FeeExtractionTest(unittest.TestCase):
+    def test_amounts_in_euros(self):
+        self.assertEqual(extract_fee('Lech zapłacił 2.5 mln € za napastnika'), '2.5 mln €')
+        self.assertEqual(extract_fee('Kwota transferu to 500 tys. €.'), '500 tys. €')
+        self.assertEqual(extract_fee('Za 300 tysięcy € przechodzi do Legii'), '300 tysięcy €')
+
+    def test_attendance_is_not_a_fee(self):
+        self.assertEqual(extract_fee('Przed 20 tys. widzów Lech wygrał 2:0'), 'Nieznana')
+        self.assertEqual(extract_fee('Stadion na 40 tysięcy miejsc był pełny'), 'Nieznana')
+
+    def test_attendance_does_not_hide_the_fee(self):
+        text = 'Przed 20 tys. widzów zaprezentowano nowy nabytek za 800 tys. €'
+        self.assertEqual(extract_fee(text), '800 tys. €')
+
+    def test_free_and_loan(self):
+        self.assertEqual(classify_transfer('Dołącza jako wolny agent').fee, 'Bez opłaty')
+        self.assertEqual(classify_transfer('Wypożyczenie do Rakowa').fee, 'Wypożyczenie')
+
+if __name__ == '__main__':
+    unittest.main()
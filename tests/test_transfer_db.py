@@ -0,0 +1,56 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from api_server import DatabaseTransferAPI
+from transfer_db import TransferDatabase
+
+def transfer(number, transfer_date):
+    return {
+        'playerName': f'Zawodnik Nazwisko{number}',
+        'type': 'in',
+        'fromTeam': 'Legia Warszawa' if number % 2 else 'Wisła Kraków',
+        'toTeam': 'Lech Poznań',
+        'transferDate': transfer_date,
+        'fee': '1M €',
+    }
+
+class DatabasePaginationTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.database = TransferDatabase(os.path.join(self.directory, 'transfers.db'))
+        dates = ['2025-01-10', None, '2025-01-05', None, '', '2024-12-01', None]
+        self.database.upsert([transfer(number, day) for number, day in enumerate(dates)])
+        self.api = DatabaseTransferAPI(self.database, ('db', self.database.revision()))
+
+    def tearDown(self):
+        self.database.close()
+        shutil.rmtree(self.directory)
+
+    def pages(self, limit, **filters):
+        served, cursor = [], None
+        while True:
+            transfers, cursor = self.api.page(cursor=cursor, limit=limit, **filters)
+            served += [t['id'] for t in transfers]
+            if cursor is None:
+                return served
+
+    def test_pages_serve_undated_rows_once(self):
+        everything = [t['id'] for t in self.api.page()[0]]
+        self.assertEqual(len(everything), 7)
+        for limit in (1, 2, 3):
+            self.assertEqual(self.pages(limit), everything)
+
+    def test_team_pages_serve_undated_rows_once(self):
+        everything = [t['id'] for t in self.api.page(team='Lech Poznań')[0]]
+        self.assertEqual(len(everything), 7)
+        self.assertEqual(self.pages(2, team='Lech Poznań'), everything)
+
+    def test_undated_rows_sort_last(self):
+        dates = [t.get('transferDate') or '' for t in self.api.page()[0]]
+        self.assertEqual(dates[:3], ['2025-01-10', '2025-01-05', '2024-12-01'])
+        self.assertEqual(set(dates[3:]), {''})
+
+if __name__ == '__main__':
+    unittest.main()
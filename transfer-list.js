@@ -0,0 +1,512 @@
+// Transfer data layer and windowed rendering shared by script.js and the built pages.
+// TransferQueries holds the data and runs in transfer-worker.js; the page talks to it
+// through TransferData and only ever gets ids back, plus the records it shows.
+
+function transferKey(transfer) {
+    return transfer.id !== undefined && transfer.id !== null
+        ? String(transfer.id)
+        : `${transfer.playerName}|${transfer.fromTeam}|${transfer.toTeam}|${transfer.transferDate}`;
+}
+
+function displayDate(dateString) {
+    // dd.mm.yyyy, as toLocaleDateString('pl-PL') shows it; build_html.py does this at build time
+    const match = /^(\d{4})-(\d{2})-(\d{2})/.exec(dateString || '');
+    return match ? `${match[3]}.${match[2]}.${match[1]}` : dateString || '';
+}
+
+function foldText(text) {
+    // Lowercase words without Polish diacritics, each preceded by a space for prefix matching
+    return ' ' + String(text || '').toLowerCase()
+        .replace(/ł/g, 'l')
+        .normalize('NFD')
+        .replace(/[\u0300-\u036f]/g, '')
+        .replace(/[^a-z0-9]+/g, ' ')
+        .trim();
+}
+
+function compareText(a, b) {
+    a = a || '';
+    b = b || '';
+    return a < b ? -1 : a > b ? 1 : 0;
+}
+
+const TRANSFER_SORTS = {
+    newest: (a, b) => compareText(b.transferDate, a.transferDate),
+    oldest: (a, b) => compareText(a.transferDate, b.transferDate),
+    player: (a, b) => (a.playerName || '').localeCompare(b.playerName || '', 'pl'),
+};
+
+class TransferIndex {
+    // Positions of transfers per team and per type, in list order, built once per dataset
+    constructor(transfers) {
+        this.transfers = transfers;
+        this.all = transfers.map((_, position) => position);
+        this.byTeam = new Map();
+        this.byType = new Map();
+
+        transfers.forEach((transfer, position) => {
+            new Set([transfer.fromTeam, transfer.toTeam]).forEach(team => {
+                if (team) {
+                    this.append(this.byTeam, team, position);
+                }
+            });
+            this.append(this.byType, transfer.type, position);
+        });
+    }
+
+    append(map, key, position) {
+        const positions = map.get(key);
+        if (positions) {
+            positions.push(position);
+        } else {
+            map.set(key, [position]);
+        }
+    }
+
+    teams() {
+        return Array.from(this.byTeam.keys()).filter(team => team !== 'Wolny agent').sort();
+    }
+
+    select(filters) {
+        // Only the team's (or type's) own transfers are looked at, never the whole list
+        const byTeam = filters.team ? this.byTeam.get(filters.team) || [] : null;
+        if (byTeam && filters.type) {
+            return byTeam.filter(position => this.transfers[position].type === filters.type);
+        }
+        const byType = filters.type ? this.byType.get(filters.type) || [] : null;
+        return byTeam || byType || this.all;
+    }
+}
+
+class TransferQueries {
+    // The transfers, their indexes and answers to queries. Requests run one at a
+    // time, so a query never sees a half-loaded dataset.
+    constructor() {
+        this.queue = Promise.resolve();
+        this.setTransfers([]);
+    }
+
+    handle(message) {
+        const result = this.queue.then(() => this.run(message));
+        this.queue = result.catch(() => {});
+        return result;
+    }
+
+    async run(message) {
+        switch (message.type) {
+            case 'load':
+                return this.add(await this.fetch(message.url, message.paginate), message);
+            case 'parse':
+                return this.add(JSON.parse(message.text), message);
+            case 'add':
+                return this.add(message.transfers, message);
+            case 'query':
+                return this.query(message);
+            case 'records':
+                return message.keys.map(key => this.byKey.get(key) || null);
+            default:
+                throw new Error(`Unknown request: ${message.type}`);
+        }
+    }
+
+    async fetch(url, paginate) {
+        // With paginate, follows the API's X-Next-Cursor header to the last page
+        const transfers = [];
+        while (url) {
+            const response = await fetch(url);
+            if (!response.ok) {
+                throw new Error(`Failed to fetch ${url}`);
+            }
+            transfers.push(...await response.json());
+            const cursor = paginate && response.headers.get('X-Next-Cursor');
+            if (cursor) {
+                const next = new URL(url);
+                next.searchParams.set('cursor', cursor);
+                url = next.href;
+            } else {
+                url = null;
+            }
+        }
+        return transfers;
+    }
+
+    add(transfers, options = {}) {
+        transfers.forEach(transfer => {
+            if (transfer.transferDateText === undefined) {
+                transfer.transferDateText = displayDate(transfer.transferDate);
+            }
+        });
+        // One record per key: the last copy of a transfer wins
+        const incoming = new Map(transfers.map(transfer => [transferKey(transfer), transfer]));
+        let added = Array.from(incoming.values());
+
+        if (options.replace) {
+            this.setTransfers(added);
+        } else {
+            // Transfers already held (pushed again, or replayed after a resume) are updated in place
+            const current = this.transfers.map((transfer, position) => {
+                const update = incoming.get(this.keys[position]);
+                incoming.delete(this.keys[position]);
+                return update || transfer;
+            });
+            added = Array.from(incoming.values());
+            this.setTransfers(options.prepend ? added.concat(current) : current.concat(added));
+        }
+        return { count: this.transfers.length, added: added.length, teams: this.index.teams() };
+    }
+
+    setTransfers(transfers) {
+        this.transfers = transfers;
+        this.index = new TransferIndex(transfers);
+        this.keys = transfers.map(transferKey);
+        this.byKey = new Map(this.keys.map((key, position) => [key, transfers[position]]));
+        // Built on first use
+        this.searchText = null;
+        this.orders = {};
+    }
+
+    query({ filters = {}, search = '', sort = '' }) {
+        let positions = this.index.select(filters);
+
+        const words = foldText(search).split(' ').filter(Boolean);
+        if (words.length) {
+            const text = this.searchable();
+            positions = positions.filter(position => words.every(word => text[position].includes(' ' + word)));
+        }
+
+        if (TRANSFER_SORTS[sort]) {
+            const { order, rank } = this.sorted(sort);
+            positions = positions === this.index.all
+                ? order
+                : positions.slice().sort((a, b) => rank[a] - rank[b]);
+        }
+        return positions.map(position => this.keys[position]);
+    }
+
+    searchable() {
+        if (!this.searchText) {
+            this.searchText = this.transfers.map(transfer => foldText([
+                transfer.playerName, transfer.fromTeam, transfer.toTeam, transfer.fee, transfer.summary
+            ].join(' ')));
+        }
+        return this.searchText;
+    }
+
+    sorted(sort) {
+        // Every transfer's place in the sort order, so subsets sort by comparing numbers
+        if (!this.orders[sort]) {
+            const compare = TRANSFER_SORTS[sort];
+            const order = this.index.all.slice()
+                .sort((a, b) => compare(this.transfers[a], this.transfers[b]));
+            const rank = new Int32Array(order.length);
+            order.forEach((position, place) => {
+                rank[position] = place;
+            });
+            this.orders[sort] = { order, rank };
+        }
+        return this.orders[sort];
+    }
+}
+
+class TransferData {
+    // Asynchronous requests to TransferQueries in transfer-worker.js. Where the
+    // page may not start workers (simple.html opened from disk), the same
+    // requests are answered on the page instead.
+    constructor(workerUrl = 'transfer-worker.js') {
+        this.calls = new Map();
+        this.nextId = 0;
+        // Requests to replay if the worker fails to start; dropped once it answers
+        this.sent = [];
+        this.local = null;
+
+        try {
+            this.worker = new Worker(workerUrl);
+            this.worker.addEventListener('message', (e) => this.receive(e.data));
+            this.worker.addEventListener('error', (e) => {
+                e.preventDefault();
+                this.fallBack();
+            });
+        } catch (error) {
+            this.fallBack();
+        }
+    }
+
+    request(type, message = {}) {
+        message = Object.assign({ type, id: ++this.nextId }, message);
+        return new Promise((resolve, reject) => {
+            this.calls.set(message.id, { resolve, reject });
+            if (this.local) {
+                this.answer(message);
+            } else {
+                if (this.sent) {
+                    this.sent.push(message);
+                }
+                this.worker.postMessage(message);
+            }
+        });
+    }
+
+    receive(reply) {
+        if (!this.local) {
+            this.sent = null;
+        }
+        const call = this.calls.get(reply.id);
+        if (!call) {
+            return;
+        }
+        this.calls.delete(reply.id);
+        if (reply.error) {
+            call.reject(new Error(reply.error));
+        } else {
+            call.resolve(reply.result);
+        }
+    }
+
+    async answer(message) {
+        try {
+            this.receive({ id: message.id, result: await this.local.handle(message) });
+        } catch (error) {
+            this.receive({ id: message.id, error: error.message });
+        }
+    }
+
+    fallBack() {
+        if (this.local) {
+            return;
+        }
+        if (this.worker) {
+            this.worker.terminate();
+        }
+        console.warn('Web Worker unavailable, filtering on the page');
+        this.local = new TransferQueries();
+        (this.sent || []).forEach(message => this.answer(message));
+        this.sent = null;
+    }
+}
+
+class VirtualList {
+    // Keeps DOM nodes only for the entries in and near the viewport.
+    // Entries are absolutely positioned from measured (or estimated) heights,
+    // and nodes are kept by key, so changing filters reuses what was built.
+    // renderKey returns null for entries whose data has not arrived yet;
+    // options.missing is told their keys, and update() draws them later.
+    constructor(container, renderKey, options = {}) {
+        this.container = container;
+        this.renderKey = renderKey;
+        this.missing = options.missing || (() => {});
+        this.empty = options.empty || '';
+        this.estimate = options.estimate || 280;
+        this.gap = options.gap || 24;
+        this.overscan = options.overscan || 4;
+        this.cacheSize = options.cacheSize || 300;
+
+        this.keys = [];
+        this.offsets = [0];
+        this.heights = new Map();
+        // key -> node, least recently used first
+        this.nodes = new Map();
+        this.mounted = new Set();
+        this.frame = null;
+        this.template = document.createElement('template');
+
+        container.innerHTML = '';
+        container.classList.add('virtual-list');
+        this.placeholder = document.createElement('div');
+
+        window.addEventListener('scroll', () => this.schedule(), { passive: true });
+        window.addEventListener('resize', () => {
+            // Entries reflow at a new width; measure them again
+            this.heights.clear();
+            this.layout();
+            this.schedule();
+        });
+    }
+
+    setKeys(keys) {
+        this.keys = keys;
+        this.layout();
+        this.update();
+    }
+
+    clear() {
+        // Forget built entries, e.g. when the records behind the keys changed
+        this.mounted.forEach(key => this.nodes.get(key).remove());
+        this.mounted.clear();
+        this.nodes.clear();
+        this.heights.clear();
+    }
+
+    layout() {
+        const offsets = new Array(this.keys.length + 1);
+        offsets[0] = 0;
+        for (let i = 0; i < this.keys.length; i++) {
+            const height = this.heights.get(this.keys[i]) || this.estimate;
+            offsets[i + 1] = offsets[i] + height + this.gap;
+        }
+        this.offsets = offsets;
+        const total = offsets[offsets.length - 1];
+        this.container.style.height = this.keys.length ? `${total - this.gap}px` : '';
+    }
+
+    schedule() {
+        if (this.frame === null) {
+            this.frame = requestAnimationFrame(() => {
+                this.frame = null;
+                this.update();
+            });
+        }
+    }
+
+    indexAt(y) {
+        // First entry whose bottom edge is below y
+        let low = 0;
+        let high = this.keys.length;
+        while (low < high) {
+            const middle = (low + high) >> 1;
+            if (this.offsets[middle + 1] <= y) {
+                low = middle + 1;
+            } else {
+                high = middle;
+            }
+        }
+        return low;
+    }
+
+    update() {
+        if (this.keys.length === 0) {
+            this.mounted.forEach(key => this.nodes.get(key).remove());
+            this.mounted.clear();
+            this.placeholder.innerHTML = this.empty;
+            this.container.appendChild(this.placeholder);
+            return;
+        }
+        this.placeholder.remove();
+
+        // Viewport in the list's own coordinates
+        const top = -this.container.getBoundingClientRect().top;
+        const first = Math.max(0, this.indexAt(top) - this.overscan);
+        const last = Math.min(this.keys.length, this.indexAt(top + window.innerHeight) + 1 + this.overscan);
+
+        const visible = new Set();
+        const missing = [];
+        for (let i = first; i < last; i++) {
+            const key = this.keys[i];
+            let node = this.nodes.get(key);
+            if (node) {
+                this.nodes.delete(key);
+            } else {
+                node = this.createNode(key);
+                if (!node) {
+                    missing.push(key);
+                    continue;
+                }
+            }
+            this.nodes.set(key, node);
+            node.style.top = `${this.offsets[i]}px`;
+            if (!node.isConnected) {
+                this.container.appendChild(node);
+            }
+            visible.add(key);
+        }
+
+        this.mounted.forEach(key => {
+            if (!visible.has(key)) {
+                this.nodes.get(key).remove();
+            }
+        });
+        this.mounted = visible;
+        this.trimCache();
+        this.measure(first, last);
+        if (missing.length) {
+            this.missing(missing);
+        }
+    }
+
+    createNode(key) {
+        const html = this.renderKey(key);
+        if (html === null) {
+            return null;
+        }
+        this.template.innerHTML = html.trim();
+        return this.template.content.firstElementChild;
+    }
+
+    measure(first, last) {
+        let changed = false;
+        for (let i = first; i < last; i++) {
+            const node = this.nodes.get(this.keys[i]);
+            const height = node ? node.offsetHeight : 0;
+            if (height && height !== this.heights.get(this.keys[i])) {
+                this.heights.set(this.keys[i], height);
+                changed = true;
+            }
+        }
+        if (changed) {
+            this.layout();
+            this.schedule();
+        }
+    }
+
+    trimCache() {
+        // Detached nodes stay around for reuse, oldest dropped first
+        for (const [key] of this.nodes) {
+            if (this.nodes.size <= this.cacheSize) {
+                break;
+            }
+            if (!this.mounted.has(key)) {
+                this.nodes.delete(key);
+            }
+        }
+    }
+}
+
+class TransferView {
+    // Shows the ids a query returns, fetching records only for the entries on screen
+    constructor(container, data, renderTransfer, options = {}) {
+        this.data = data;
+        this.records = new Map();
+        this.requested = new Set();
+        this.ticket = 0;
+        this.list = new VirtualList(container, key => {
+            const transfer = this.records.get(key);
+            return transfer ? renderTransfer(transfer) : null;
+        }, Object.assign({}, options, { missing: keys => this.fetch(keys) }));
+    }
+
+    async show(query) {
+        const ticket = ++this.ticket;
+        const keys = await this.data.request('query', query);
+        // A newer query was sent while this one ran
+        if (ticket === this.ticket) {
+            this.list.setKeys(keys);
+        }
+    }
+
+    async fetch(keys) {
+        keys = keys.filter(key => !this.requested.has(key));
+        if (keys.length === 0) {
+            return;
+        }
+        keys.forEach(key => this.requested.add(key));
+        try {
+            const transfers = await this.data.request('records', { keys });
+            transfers.forEach((transfer, i) => {
+                if (transfer) {
+                    this.records.set(keys[i], transfer);
+                }
+            });
+            this.list.schedule();
+        } catch (error) {
+            console.error('Error loading transfers:', error);
+            // Tried again when the entries are next drawn
+            keys.forEach(key => this.requested.delete(key));
+        }
+    }
+
+    forget() {
+        // After the dataset was replaced: records and entries may be outdated
+        this.records.clear();
+        this.requested.clear();
+        this.list.clear();
+    }
+}
@@ -0,0 +1,13 @@
+// Answers TransferData's requests off the page's main thread
+importScripts('transfer-list.js');
+
+const queries = new TransferQueries();
+
+self.addEventListener('message', async (e) => {
+    const { id } = e.data;
+    try {
+        self.postMessage({ id, result: await queries.handle(e.data) });
+    } catch (error) {
+        self.postMessage({ id, error: error.message });
+    }
+});
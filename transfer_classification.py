@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Transfer classification shared by the scrapers
+Detects transfer direction and fee from article text in a single regex scan
+"""
+
+import re
+from collections import Counter, namedtuple
+
+OUTGOING_KEYWORDS = ['opuszcza', 'odchodzi', 'sprzedany', 'wypożyczony', 'żegna się', 'transfer do']
+INCOMING_KEYWORDS = ['dołącza', 'podpisuje', 'przychodzi', 'zatrudnia', 'transfer z', 'nowym zawodnikiem']
+
+KEYWORD_KINDS = dict.fromkeys(OUTGOING_KEYWORDS, 'out')
+KEYWORD_KINDS.update(dict.fromkeys(INCOMING_KEYWORDS, 'in'))
+
+# Fee patterns over lowercased text. Every branch starts with a literal
+# character so the regex engine can skip ahead to candidate positions.
+# Amounts need the euro sign, so "20 tys. widzów" in an article is no fee.
+FEE_PATTERNS = [
+    r'bezpłatnie',
+    r'wolny\w*\s+agent\w*',
+    r'wypożyczeni[eua]',
+    r'(?:0|1|2|3|4|5|6|7|8|9)[0-9]*(?:[.,][0-9]+)?\s*'
+    r'(?:m(?:ln\.?|ilion\w*)?|tys(?:\w+|\.)?)\s*€',
+]
+
+# When several kinds of fee appear, the earliest kind in this list wins
+FEE_PRIORITY = ['million', 'thousand', 'free', 'loan']
+
+Classification = namedtuple('Classification', 'type fee confidence')
+
+def _literal_trie(words):
+    """Build a prefix-factored alternation matching any of words"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{pattern})?' if '' in node else pattern
+
+    return build(trie)
+
+CLASSIFIER_REGEX = re.compile('|'.join([_literal_trie(KEYWORD_KINDS)] + FEE_PATTERNS))
+
+def _match_kind(matched):
+    """Map a lowercased match back to a keyword direction or fee kind"""
+    kind = KEYWORD_KINDS.get(matched)
+    if kind:
+        return kind
+    if matched[0].isdigit():
+        return 'thousand' if 'tys' in matched else 'million'
+    if matched.startswith('wypożyczeni'):
+        return 'loan'
+    return 'free'
+
+def classify_transfer(text, default_fee='Nieznana'):
+    """Get transfer type, fee and a 0-1 confidence for the type in one scan"""
+    lowered = text.lower()
+    # Fee text keeps its original casing unless lowercasing changed offsets
+    source = text if len(lowered) == len(text) else lowered
+
+    counts = {'out': 0, 'in': 0}
+    fees = {}
+
+    # findall + Counter keep the per-match work in C; only distinct matches
+    # are looked at in Python
+    for matched, hits in Counter(CLASSIFIER_REGEX.findall(lowered)).items():
+        kind = _match_kind(matched)
+        if kind in counts:
+            counts[kind] += hits
+            continue
+
+        # Keep the earliest occurrence of each fee kind
+        start = lowered.find(matched)
+        if kind not in fees or start < fees[kind][0]:
+            fees[kind] = (start, source[start:start + len(matched)])
+
+    # Any outgoing keyword decides the type, as the scrapers always did
+    total = counts['out'] + counts['in']
+    if counts['out']:
+        transfer_type, confidence = 'out', counts['out'] / total
+    elif counts['in']:
+        transfer_type, confidence = 'in', 1.0
+    else:
+        transfer_type, confidence = 'in', 0.0
+
+    fee = default_fee
+    for kind in FEE_PRIORITY:
+        if kind in fees:
+            if kind == 'free':
+                fee = 'Bez opłaty'
+            elif kind == 'loan':
+                fee = 'Wypożyczenie'
+            else:
+                fee = fees[kind][1].strip()
+            break
+
+    return Classification(transfer_type, fee, confidence)
+
+def determine_transfer_type(text):
+    """Determine if a transfer is incoming or outgoing"""
+    return classify_transfer(text).type
+
+def extract_fee(text, default_fee='Nieznana'):
+    """Extract transfer fee from text"""
+    return classify_transfer(text, default_fee).fee
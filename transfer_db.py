@@ -0,0 +1,442 @@
+#!/usr/bin/env python3
+"""
+Historical transfer database
+Keeps every transfer the scrapers have ever seen; transfers.json is exported from it
+"""
+
+import heapq
+import itertools
+import json
+import os
+import sqlite3
+import threading
+from datetime import date, datetime, timedelta
+
+from deduplication import DATE_WINDOW, merge_records, same_transfer, surname
+from publisher import DatasetPublisher
+from transfer_fees import with_fee
+from transfer_search import SearchIndex, search_text, tokenize
+from transfer_stats import ALL_WINDOWS, STAT_FIELDS, contributions, sort_rows, stats_row
+
+DEFAULT_DB_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'transfers.db')
+
+# Shape of the dates same_transfer() can compare; any other value counts as undated
+ISO_DATE = '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]'
+
+# Bump when fee parsing or the aggregates change, so stored records and stats are recomputed
+FEE_VERSION = 2
+
+class TransferDatabase:
+    """SQLite (WAL mode) store of transfers with indexed team/type/date/player queries"""
+
+    def __init__(self, filename=DEFAULT_DB_FILE):
+        self.filename = filename
+        self.lock = threading.Lock()
+        # Shared between threads; every access goes through self.lock
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        # WAL lets the API read while a scraper writes
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS transfers (
+                id INTEGER PRIMARY KEY,
+                player TEXT,
+                surname TEXT,
+                type TEXT,
+                from_team TEXT,
+                to_team TEXT,
+                transfer_date TEXT,
+                record TEXT,
+                first_seen TEXT,
+                last_seen TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_transfers_date ON transfers (transfer_date);
+            CREATE INDEX IF NOT EXISTS idx_transfers_from ON transfers (from_team, transfer_date);
+            CREATE INDEX IF NOT EXISTS idx_transfers_to ON transfers (to_team, transfer_date);
+            CREATE INDEX IF NOT EXISTS idx_transfers_type ON transfers (type, transfer_date);
+            CREATE INDEX IF NOT EXISTS idx_transfers_player ON transfers (surname, transfer_date);
+            CREATE TABLE IF NOT EXISTS stats (
+                team TEXT,
+                transfer_window TEXT,
+                arrivals INTEGER DEFAULT 0,
+                departures INTEGER DEFAULT 0,
+                spend INTEGER DEFAULT 0,
+                income INTEGER DEFAULT 0,
+                fees INTEGER DEFAULT 0,
+                loans INTEGER DEFAULT 0,
+                free INTEGER DEFAULT 0,
+                undisclosed INTEGER DEFAULT 0,
+                PRIMARY KEY (team, transfer_window)
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER
+            );
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('revision', 0);
+            INSERT OR IGNORE INTO meta (key, value) VALUES ('fees', 0);
+            -- Undated rows are stored as '', which sorts and pages like the API's
+            -- sort_key; NULL would compare false against every cursor
+            UPDATE transfers SET transfer_date = '' WHERE transfer_date IS NULL;
+        ''')
+        self.conn.commit()
+        self._migrate_fees()
+
+        self.fts = self._create_fts()
+        # In-memory fallback when SQLite was built without FTS5: (revision, index)
+        self._search_index = (None, None)
+
+    def _create_fts(self):
+        """Create the full-text index if FTS5 is available; returns whether it is"""
+        try:
+            # Text is folded before indexing, so Polish diacritics never matter
+            self.conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS transfers_fts
+                USING fts5(player, teams, text)
+            ''')
+        except sqlite3.OperationalError:
+            return False
+
+        # Databases from before the index existed are indexed once
+        indexed = self.conn.execute('SELECT COUNT(*) FROM transfers_fts').fetchone()[0]
+        if indexed != self.conn.execute('SELECT COUNT(*) FROM transfers').fetchone()[0]:
+            with self.conn:
+                self.conn.execute('DELETE FROM transfers_fts')
+                for row_id, record in self.conn.execute('SELECT id, record FROM transfers').fetchall():
+                    self._index(row_id, json.loads(record))
+        return True
+
+    def _migrate_fees(self):
+        """Parse fees of records stored by an older version and rebuild the aggregates"""
+        version = self.conn.execute("SELECT value FROM meta WHERE key = 'fees'").fetchone()[0]
+        if version == FEE_VERSION:
+            return
+
+        with self.conn:
+            self.conn.execute('DELETE FROM stats')
+            rows = self.conn.execute('SELECT id, record FROM transfers').fetchall()
+            for row_id, record in rows:
+                transfer = with_fee(json.loads(record))
+                self.conn.execute('UPDATE transfers SET record = ? WHERE id = ?',
+                                  (json.dumps(transfer, ensure_ascii=False), row_id))
+                self._count(transfer)
+            self.conn.execute("UPDATE meta SET value = ? WHERE key = 'fees'", (FEE_VERSION,))
+            if rows:
+                self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+
+    def _count(self, transfer, sign=1):
+        """Add a transfer to (or, with sign=-1, take it out of) the stats table"""
+        columns = ', '.join(STAT_FIELDS)
+        updates = ', '.join(f'{field} = {field} + excluded.{field}' for field in STAT_FIELDS)
+        for team, window, deltas in contributions(transfer):
+            values = [sign * deltas.get(field, 0) for field in STAT_FIELDS]
+            self.conn.execute(f'''
+                INSERT INTO stats (team, transfer_window, {columns})
+                VALUES (?, ?, {', '.join('?' * len(STAT_FIELDS))})
+                ON CONFLICT (team, transfer_window) DO UPDATE SET {updates}
+            ''', [team, window] + values)
+        if sign < 0:
+            self.conn.execute('DELETE FROM stats WHERE arrivals = 0 AND departures = 0')
+
+    def _index(self, row_id, transfer):
+        self.conn.execute('DELETE FROM transfers_fts WHERE rowid = ?', (row_id,))
+        self.conn.execute(
+            'INSERT INTO transfers_fts (rowid, player, teams, text) VALUES (?, ?, ?, ?)',
+            (row_id,
+             search_text(transfer, 'playerName'),
+             search_text(transfer, 'fromTeam') + ' ' + search_text(transfer, 'toTeam'),
+             search_text(transfer, 'fee') + ' ' + search_text(transfer, 'summary')))
+
+    def _find(self, transfer):
+        """Row id and record of a stored report of the same transfer, if any"""
+        block = surname(transfer.get('playerName'))
+        if block is None:
+            # Unknown player: only an identical clubs-and-date report matches
+            row = self.conn.execute('''
+                SELECT id, record FROM transfers WHERE surname IS NULL
+                    AND from_team IS ? AND to_team IS ? AND transfer_date IS ?
+            ''', (transfer.get('fromTeam'), transfer.get('toTeam'),
+                  transfer.get('transferDate') or '')).fetchone()
+            return (row[0], json.loads(row[1])) if row else None
+
+        try:
+            day = date.fromisoformat(transfer.get('transferDate') or '')
+        except ValueError:
+            day = None
+        if day is None:
+            # An undated report may match a stored one of any date
+            rows = self.conn.execute(
+                'SELECT id, record FROM transfers WHERE surname = ?', (block,)).fetchall()
+        else:
+            # Only reports within DATE_WINDOW days, or undated ones, can match;
+            # both halves are answered from idx_transfers_player
+            rows = self.conn.execute(f'''
+                SELECT id, record FROM transfers
+                    WHERE surname = ? AND transfer_date BETWEEN ? AND ?
+                UNION ALL
+                SELECT id, record FROM transfers
+                    WHERE surname = ? AND transfer_date NOT GLOB '{ISO_DATE}'
+            ''', (block, (day - timedelta(days=DATE_WINDOW)).isoformat(),
+                  (day + timedelta(days=DATE_WINDOW)).isoformat(), block)).fetchall()
+        for row_id, record in rows:
+            record = json.loads(record)
+            if same_transfer(record, transfer, DATE_WINDOW):
+                return row_id, record
+        return None
+
+    def upsert(self, transfers):
+        """Insert new transfers and merge reports of ones already stored
+
+        Upserting the same records again changes nothing, so every scraper
+        run can write everything it found.
+        """
+        now = datetime.now().isoformat(timespec='seconds')
+        inserted = updated = 0
+
+        with self.lock:
+            with self.conn:
+                for transfer in transfers:
+                    transfer = {key: value for key, value in transfer.items() if key != 'id'}
+                    found = self._find(transfer)
+
+                    if found:
+                        row_id, stored = found
+                        transfer = merge_records([transfer, stored])
+                        if transfer == stored:
+                            continue
+                        self._count(stored, sign=-1)
+                        self._count(transfer)
+                        self.conn.execute('''
+                            UPDATE transfers SET player = ?, surname = ?, type = ?, from_team = ?,
+                                to_team = ?, transfer_date = ?, record = ?, last_seen = ?
+                            WHERE id = ?
+                        ''', self._columns(transfer) + (now, row_id))
+                        if self.fts:
+                            self._index(row_id, transfer)
+                        updated += 1
+                    else:
+                        transfer = merge_records([transfer])
+                        inserted_row = self.conn.execute('''
+                            INSERT INTO transfers (player, surname, type, from_team, to_team,
+                                transfer_date, record, first_seen, last_seen)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        ''', self._columns(transfer) + (now, now))
+                        if self.fts:
+                            self._index(inserted_row.lastrowid, transfer)
+                        self._count(transfer)
+                        inserted += 1
+
+                if inserted or updated:
+                    self.conn.execute(
+                        "UPDATE meta SET value = value + 1 WHERE key = 'revision'")
+
+            # Fold the WAL back into the main file, which is what gets committed
+            self.conn.execute('PRAGMA wal_checkpoint(PASSIVE)')
+
+        print(f"Database: {inserted} new transfers, {updated} updated")
+        return inserted, updated
+
+    def _columns(self, transfer):
+        return (
+            transfer.get('playerName'),
+            surname(transfer.get('playerName')),
+            transfer.get('type'),
+            transfer.get('fromTeam'),
+            transfer.get('toTeam'),
+            transfer.get('transferDate') or '',
+            json.dumps(transfer, ensure_ascii=False),
+        )
+
+    def revision(self):
+        """Counter bumped by every upsert that changed something"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT value FROM meta WHERE key = 'revision'").fetchone()[0]
+
+    def _filters(self, transfer_type=None, since=None, until=None, cursor=None):
+        clauses, params = [], []
+        if transfer_type:
+            clauses.append('type = ?')
+            params.append(transfer_type)
+        if since:
+            clauses.append('transfer_date >= ?')
+            params.append(since)
+        if until:
+            clauses.append('transfer_date <= ?')
+            params.append(until)
+        if cursor:
+            clauses.append('(transfer_date, id) < (?, ?)')
+            params += list(cursor)
+        return clauses, params
+
+    def _select(self, conn, clauses, params, limit=None):
+        """Execute a newest-first select; the returned cursor yields rows lazily"""
+        sql = 'SELECT id, record, transfer_date FROM transfers'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY transfer_date DESC, id DESC'
+        if limit:
+            sql += ' LIMIT ?'
+            params = params + [limit]
+        return conn.execute(sql, params)
+
+    def _rows(self, conn, team, clauses, params, limit=None):
+        """Matching rows newest first, including either side of a team filter"""
+        if not team:
+            return iter(self._select(conn, clauses, params, limit))
+
+        # One index range scan per side, merged here, so results never need
+        # a sort over every transfer of the team
+        outgoing = self._select(conn, clauses + ['from_team = ?'], params + [team], limit)
+        incoming = self._select(conn, clauses + ['to_team = ?'], params + [team], limit)
+        merged = heapq.merge(outgoing, incoming,
+                             key=lambda row: (row[2] or '', row[0]), reverse=True)
+        rows = self._unique(merged)
+        return itertools.islice(rows, limit) if limit else rows
+
+    def _unique(self, rows):
+        # A transfer between two clubs of the same name shows up in both scans
+        last = None
+        for row in rows:
+            if row[0] != last:
+                last = row[0]
+                yield row
+
+    def _record(self, row):
+        transfer = json.loads(row[1])
+        transfer['id'] = row[0]
+        return transfer
+
+    def query(self, team=None, transfer_type=None, since=None, until=None,
+              cursor=None, limit=None):
+        """Get transfers newest first, optionally filtered
+
+        cursor is the (transferDate, id) of the last record already seen;
+        only older records are returned.
+        """
+        clauses, params = self._filters(transfer_type, since, until, cursor)
+        with self.lock:
+            rows = list(self._rows(self.conn, team, clauses, params, limit))
+        return [self._record(row) for row in rows]
+
+    def stream(self, team=None, transfer_type=None, since=None, until=None, batch_size=500):
+        """Yield matching transfers newest first, reading rows in batches
+
+        Uses its own connection, so a slow consumer never holds the shared
+        lock and, thanks to WAL, never blocks a scraper writing meanwhile.
+        """
+        clauses, params = self._filters(transfer_type, since, until)
+        conn = sqlite3.connect(self.filename, check_same_thread=False)
+        try:
+            rows = self._rows(conn, team, clauses, params)
+            while True:
+                chunk = list(itertools.islice(rows, batch_size))
+                if not chunk:
+                    break
+                for row in chunk:
+                    yield self._record(row)
+        finally:
+            conn.close()
+
+    def search(self, query, limit=20):
+        """Get up to limit (transfer, score) pairs matching every word of query as a prefix"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        if not self.fts:
+            revision = self.revision()
+            if self._search_index[0] != revision:
+                self._search_index = (revision, SearchIndex(self.query()))
+            return self._search_index[1].search(query, limit)
+
+        # Tokens are \w+ only, so quoting them is enough to keep FTS syntax out
+        match = ' '.join(f'"{term}"*' for term in terms)
+        with self.lock:
+            rows = self.conn.execute('''
+                SELECT t.id, t.record, bm25(transfers_fts, 3.0, 2.0, 1.0) AS rank
+                FROM transfers_fts JOIN transfers t ON t.id = transfers_fts.rowid
+                WHERE transfers_fts MATCH ?
+                ORDER BY rank, t.transfer_date DESC
+                LIMIT ?
+            ''', (match, limit)).fetchall()
+
+        # bm25() is lower for better matches
+        return [(self._record(row), -row[2]) for row in rows]
+
+    def stats(self, team=None, window=ALL_WINDOWS, sort='spend'):
+        """Precomputed aggregates of one window (every window when None), optionally for one team"""
+        clauses, params = [], []
+        if team:
+            clauses.append('team = ?')
+            params.append(team)
+        if window:
+            clauses.append('transfer_window = ?')
+            params.append(window)
+
+        sql = f"SELECT team, transfer_window, {', '.join(STAT_FIELDS)} FROM stats"
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+        with self.lock:
+            rows = self.conn.execute(sql, params).fetchall()
+        return sort_rows([stats_row(row[0], row[1], dict(zip(STAT_FIELDS, row[2:])))
+                          for row in rows], sort)
+
+    def teams(self):
+        """Get all teams involved in a stored transfer"""
+        with self.lock:
+            rows = self.conn.execute('''
+                SELECT from_team FROM transfers UNION SELECT to_team FROM transfers
+            ''').fetchall()
+        return sorted(team for team, in rows if team and team != 'Wolny agent')
+
+    def last_id(self):
+        """Highest row id; rows inserted later get higher ones"""
+        with self.lock:
+            return self.conn.execute('SELECT COALESCE(MAX(id), 0) FROM transfers').fetchone()[0]
+
+    def added_since(self, row_id):
+        """Transfers inserted after row id row_id, oldest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT id, record FROM transfers WHERE id > ? ORDER BY id', (row_id,)).fetchall()
+        return [self._record(row) for row in rows]
+
+    def count(self):
+        with self.lock:
+            return self.conn.execute('SELECT COUNT(*) FROM transfers').fetchone()[0]
+
+    def import_json(self, filename):
+        """Seed the database from an earlier transfers.json"""
+        try:
+            with open(filename, 'r', encoding='utf-8') as f:
+                transfers = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(transfers, list):
+            self.upsert(transfers)
+
+    def export_json(self, filename='transfers.json', days=None, limit=None):
+        """Publish the newest transfers as a JSON file and return them"""
+        since = (date.today() - timedelta(days=days)).isoformat() if days else None
+        transfers = self.query(since=since, limit=limit)
+
+        # Replaced atomically and versioned in manifest.json next to it
+        DatasetPublisher(filename).publish(transfers)
+
+        print(f"Exported {len(transfers)} of {self.count()} stored transfers to {filename}")
+        return transfers
+
+    def save(self, transfers, filename='transfers.json', days=None, limit=None):
+        """Store scraped transfers and republish filename; returns what was exported"""
+        # Carry over the data saved before the database existed
+        if not self.count():
+            self.import_json(filename)
+
+        # Reports of already stored transfers are merged into them
+        self.upsert(transfers)
+        return self.export_json(filename, days=days, limit=limit)
+
+    def close(self):
+        with self.lock:
+            self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self.conn.close()
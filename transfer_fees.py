@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Transfer fee normalization
+Turns free-text fees ("3.5M €", "500k €", "Wypożyczenie") into a EUR amount and a category
+"""
+
+import re
+import unicodedata
+from collections import namedtuple
+
+# Approximate fixed rates; fees are estimates to begin with
+EUR_RATES = {
+    'EUR': 1.0,
+    'PLN': 0.23,
+    'USD': 0.92,
+    'GBP': 1.17,
+}
+
+# Categories, from the fee text alone
+LOAN = 'loan'
+FREE = 'free'
+UNDISCLOSED = 'undisclosed'
+FEE = 'fee'
+
+LOAN_WORDS = ('wypozycz', 'loan')
+FREE_WORDS = ('bez oplaty', 'bezplatn', 'wolny', 'za darmo', 'free', 'koniec kontraktu')
+
+# Multiplier words of normalized fee text and their values
+MULTIPLIERS = [
+    (r'mld|bn|billion\w*', 10 ** 9),
+    (r'mln|mil\w*|m', 10 ** 6),
+    (r'tys\w*|k|thousand\w*', 10 ** 3),
+]
+
+CURRENCIES = [
+    (re.compile(r'zl\b|pln'), 'PLN'),
+    (re.compile(r'\$|usd|dolar'), 'USD'),
+    (re.compile(r'£|gbp|funt'), 'GBP'),
+]
+
+# A currency right after a bare number makes it an amount ("0 €", "300 zl")
+_CURRENCY_AFTER = re.compile(r'€|eur\b|zl\b|pln|\$|usd|£|gbp')
+
+_LETTERS = str.maketrans({'ł': 'l', 'Ł': 'L'})
+
+# "1 500 000", "2.000.000", "3.5", "1,5", optionally followed by a multiplier ("mln.", "k")
+_AMOUNT = re.compile(
+    r'(\d{1,3}(?:[ .,]\d{3})+|\d+(?:[.,]\d+)?)\s*'
+    r'(?:(' + '|'.join(pattern for pattern, _ in MULTIPLIERS) + r')\b\.?)?')
+
+Fee = namedtuple('Fee', 'amount category')
+
+def normalize_fee_text(text):
+    """Lowercase, strip diacritics and collapse whitespace, keeping decimal points"""
+    text = unicodedata.normalize('NFKD', text.translate(_LETTERS))
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+def parse_amount(text):
+    """EUR value of the first amount in normalized fee text, or None"""
+    for match in _AMOUNT.finditer(text):
+        number, multiplier = match.groups()
+        number = number.replace(' ', '')
+        # "2.000.000" and "500,000" group thousands; "1.500 mln" is one and a half
+        if len(re.findall(r'[.,]\d{3}', number)) > (1 if multiplier else 0):
+            number = number.replace('.', '').replace(',', '')
+        value = float(number.replace(',', '.'))
+        if multiplier:
+            value *= next(factor for pattern, factor in MULTIPLIERS
+                          if re.fullmatch(pattern, multiplier))
+        elif value < 1000 and not _CURRENCY_AFTER.match(text, match.end()):
+            # A bare small number ("2 mecze") is not a fee
+            continue
+
+        currency = next((code for regex, code in CURRENCIES if regex.search(text)), 'EUR')
+        return round(value * EUR_RATES[currency])
+    return None
+
+def parse_fee(text):
+    """Parse fee text into a Fee(amount in EUR or None, category)
+
+    Loans keep their loan fee when one is given; free transfers are worth
+    0 EUR; anything without a recognisable amount is undisclosed.
+    """
+    if not isinstance(text, str):
+        return Fee(None, UNDISCLOSED)
+
+    text = normalize_fee_text(text)
+    amount = parse_amount(text)
+    if any(word in text for word in LOAN_WORDS):
+        return Fee(amount, LOAN)
+    if amount is None and any(word in text for word in FREE_WORDS):
+        return Fee(0, FREE)
+    if amount is None:
+        return Fee(None, UNDISCLOSED)
+    return Fee(amount, FEE if amount else FREE)
+
+def with_fee(transfer):
+    """Set feeEur and feeCategory on transfer from its fee text; returns transfer"""
+    fee = parse_fee(transfer.get('fee'))
+    transfer['feeEur'] = fee.amount
+    transfer['feeCategory'] = fee.category
+    return transfer
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Full-text search over transfers
+Diacritic-insensitive, prefix-matching inverted index with BM25-style ranking
+"""
+
+import bisect
+import heapq
+import math
+import re
+from collections import defaultdict
+
+from deduplication import fold
+
+# Field weights: a hit in the player's name counts more than one in the summary
+SEARCH_FIELDS = {
+    'playerName': 3.0,
+    'fromTeam': 2.0,
+    'toTeam': 2.0,
+    'fee': 1.0,
+    'summary': 1.0,
+}
+
+# Prefix hits score a little lower than whole-word hits
+PREFIX_PENALTY = 0.8
+
+_TOKEN = re.compile(r'\w+')
+
+def tokenize(text):
+    """Split text into folded search tokens ('Wypożyczenie' -> 'wypozyczenie')"""
+    return _TOKEN.findall(fold(text)) if text else []
+
+def search_text(transfer, field):
+    """Folded text of one field, as indexed"""
+    return ' '.join(tokenize(transfer.get(field)))
+
+class SearchIndex:
+    """Inverted index from folded tokens to weighted term frequencies per transfer
+
+    Every query term is matched as a prefix of indexed tokens; a transfer
+    must match all terms. Results are ranked by BM25 over the weighted
+    fields, newer transfers first on equal scores.
+    """
+
+    def __init__(self, transfers, k1=1.2, b=0.75):
+        self.transfers = transfers
+        self.k1 = k1
+        self.b = b
+
+        postings = defaultdict(dict)
+        self.lengths = []
+        for pos, transfer in enumerate(transfers):
+            length = 0.0
+            for field, weight in SEARCH_FIELDS.items():
+                for token in tokenize(transfer.get(field)):
+                    postings[token][pos] = postings[token].get(pos, 0.0) + weight
+                    length += weight
+            self.lengths.append(length)
+
+        self.postings = dict(postings)
+        # Sorted vocabulary: every token with a given prefix is one contiguous range
+        self.vocabulary = sorted(self.postings)
+        average = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+        # BM25 length normalisation per transfer, computed once
+        self.norms = [k1 * (1 - b + b * length / average) for length in self.lengths]
+
+    def expand(self, term):
+        """Indexed tokens starting with term"""
+        start = bisect.bisect_left(self.vocabulary, term)
+        stop = bisect.bisect_left(self.vocabulary, term + '\U0010ffff')
+        return self.vocabulary[start:stop]
+
+    def _term_scores(self, term):
+        """BM25 contribution of one query term for each matching transfer"""
+        scores = {}
+        total = len(self.transfers)
+        for token in self.expand(term):
+            docs = self.postings[token]
+            idf = math.log(1 + (total - len(docs) + 0.5) / (len(docs) + 0.5))
+            factor = 1.0 if token == term else PREFIX_PENALTY
+            weight = factor * idf * (self.k1 + 1)
+            norms = self.norms
+            for pos, tf in docs.items():
+                score = weight * tf / (tf + norms[pos])
+                if score > scores.get(pos, 0.0):
+                    scores[pos] = score
+        return scores
+
+    def search(self, query, limit=20):
+        """Get up to limit (transfer, score) pairs, best first"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        # Rarest terms first, so the candidate set shrinks as fast as possible
+        per_term = sorted((self._term_scores(term) for term in set(terms)), key=len)
+        totals = dict(per_term[0])
+        for scores in per_term[1:]:
+            totals = {pos: total + scores[pos] for pos, total in totals.items() if pos in scores}
+            if not totals:
+                return []
+
+        ranked = heapq.nlargest(
+            limit, totals.items(),
+            key=lambda item: (item[1], self.transfers[item[0]].get('transferDate') or ''))
+        return [(self.transfers[pos], score) for pos, score in ranked]
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Transfer value analytics
+Per-team, per-window spend/income/count aggregates, updated one transfer at a time
+"""
+
+from collections import Counter, defaultdict
+
+from deduplication import is_unknown
+from transfer_fees import FEE, FREE, LOAN, UNDISCLOSED, parse_fee
+
+# Aggregated counters, in output order; net = income - spend is derived
+STAT_FIELDS = ['arrivals', 'departures', 'spend', 'income',
+               'fees', 'loans', 'free', 'undisclosed']
+
+CATEGORY_FIELDS = {FEE: 'fees', LOAN: 'loans', FREE: 'free', UNDISCLOSED: 'undisclosed'}
+
+# Window key covering a team's whole history
+ALL_WINDOWS = 'all'
+
+STAT_SORTS = ['team', 'net'] + STAT_FIELDS
+
+def transfer_window(transfer_date):
+    """Transfer window of an ISO date: '2025-summer' (Jun-Oct) or '2025-winter' (Nov 2024-May 2025)"""
+    try:
+        year, month = int(transfer_date[:4]), int(transfer_date[5:7])
+    except (TypeError, ValueError):
+        return None
+    if 6 <= month <= 10:
+        return f'{year}-summer'
+    # Deals announced late in the year are for the winter window that follows
+    return f'{year + 1 if month > 10 else year}-winter'
+
+def contributions(transfer):
+    """Yield (team, window, deltas) for every aggregate transfer counts towards
+
+    The buying club gets an arrival and the fee as spend, the selling club
+    a departure and the fee as income; both count the fee category. Each
+    side counts in its own window row and in its ALL_WINDOWS row.
+    """
+    category = transfer.get('feeCategory')
+    if category is None:
+        amount, category = parse_fee(transfer.get('fee'))
+    else:
+        amount = transfer.get('feeEur')
+    amount = amount or 0
+
+    window = transfer_window(transfer.get('transferDate'))
+    windows = [ALL_WINDOWS] + ([window] if window else [])
+    sides = [(transfer.get('toTeam'), 'arrivals', 'spend'),
+             (transfer.get('fromTeam'), 'departures', 'income')]
+
+    for team, count_field, money_field in sides:
+        if is_unknown(team) or team == 'Wolny agent':
+            continue
+        deltas = {count_field: 1, money_field: amount, CATEGORY_FIELDS[category]: 1}
+        for key in windows:
+            yield team, key, deltas
+
+def contribution_key(transfer):
+    """The fields contributions() reads; transfers with equal keys count the same"""
+    return tuple(transfer.get(field) for field in
+                 ('fromTeam', 'toTeam', 'transferDate', 'fee', 'feeEur', 'feeCategory'))
+
+def stats_row(team, window, values):
+    """Output record of one aggregate"""
+    row = {'team': team, 'window': window}
+    row.update((field, values.get(field, 0)) for field in STAT_FIELDS)
+    row['net'] = row['income'] - row['spend']
+    return row
+
+def sort_rows(rows, sort='spend'):
+    """Order stats rows by team name, or by a counter, largest first"""
+    if sort == 'team':
+        return sorted(rows, key=lambda row: (row['team'], row['window']))
+    return sorted(rows, key=lambda row: (-row[sort], row['team'], row['window']))
+
+class TransferStats:
+    """In-memory aggregates; add() and remove() touch only the transfer's own rows"""
+
+    def __init__(self, transfers=()):
+        self.totals = defaultdict(lambda: dict.fromkeys(STAT_FIELDS, 0))
+        for transfer in transfers:
+            self.add(transfer)
+
+    def add(self, transfer, sign=1):
+        for team, window, deltas in contributions(transfer):
+            totals = self.totals[(team, window)]
+            for field, value in deltas.items():
+                totals[field] += sign * value
+            if not totals['arrivals'] and not totals['departures']:
+                del self.totals[(team, window)]
+
+    def remove(self, transfer):
+        self.add(transfer, sign=-1)
+
+    def updated(self, old, new):
+        """Copy of these aggregates over the old transfers, moved to the new ones
+
+        Only transfers that differ between the two are removed or added;
+        the rest keep their counts without being parsed again.
+        """
+        before = Counter(map(contribution_key, old))
+        after = Counter(map(contribution_key, new))
+        stats = TransferStats()
+        stats.totals.update((key, dict(values)) for key, values in self.totals.items())
+        for transfers, changed, apply in ((old, before - after, stats.remove),
+                                          (new, after - before, stats.add)):
+            for transfer in transfers:
+                key = contribution_key(transfer)
+                if changed[key]:
+                    changed[key] -= 1
+                    apply(transfer)
+        return stats
+
+    def rows(self, team=None, window=ALL_WINDOWS, sort='spend'):
+        """Aggregates of one window (or every window when None), optionally for one team"""
+        rows = [stats_row(key[0], key[1], values) for key, values in self.totals.items()
+                if (team is None or key[0] == team) and (window is None or key[1] == window)]
+        return sort_rows(rows, sort)